@@ -0,0 +1,60 @@
+"""
+CPU cost per second of 16 kHz audio for cutting the microphone chunks into Porcupine frames:
+the former Python list of NumPy scalars (extend, then slice off every frame) against the
+FrameAssembler, which yields views of the chunks. Large chunks emulate a backlog, e.g. after
+the event loop has been busy and the capture hub hands over several chunks at once.
+"""
+import time
+import argparse
+import numpy as np
+from vocallmate.audio_device.frame_assembler import FrameAssembler
+
+sample_rate = 16000
+
+
+def list_frames(chunks, frame_length):
+    buffer = []
+    for chunk in chunks:
+        pcm = np.frombuffer(chunk, dtype=np.int16)
+        buffer.extend(pcm)
+        while len(buffer) >= frame_length:
+            frame = np.array(buffer[:frame_length], dtype=np.int16)
+            buffer = buffer[frame_length:]
+            yield frame
+
+
+def assembler_frames(chunks, frame_length):
+    frames = FrameAssembler(frame_length)
+    for chunk in chunks:
+        yield from frames.push(chunk)
+
+
+def measure(frame_source, chunks, frame_length, seconds):
+    start = time.process_time()
+    count = 0
+    for _ in frame_source(chunks, frame_length):
+        count += 1
+    return (time.process_time() - start) / seconds * 1000, count
+
+
+def main(args):
+    audio = np.random.default_rng(0).integers(-3000, 3000, sample_rate * args.seconds, dtype=np.int16)
+    print(f"{args.seconds}s of audio, frame length {args.frame_length}")
+    print(f"{'chunk':>8}{'list ms/s':>12}{'assembler ms/s':>16}{'speedup':>10}")
+    for chunk_frames in args.chunks:
+        chunks = [audio[pos:pos + chunk_frames].tobytes() for pos in range(0, len(audio), chunk_frames)]
+        expected = list(map(bytes, list_frames(chunks, args.frame_length)))
+        if list(map(bytes, assembler_frames(chunks, args.frame_length))) != expected:
+            print(f"warning: frames differ for chunks of {chunk_frames}")
+        list_ms, _ = measure(list_frames, chunks, args.frame_length, args.seconds)
+        assembler_ms, _ = measure(assembler_frames, chunks, args.frame_length, args.seconds)
+        print(f"{chunk_frames:>8}{list_ms:>12.2f}{assembler_ms:>16.3f}{list_ms / assembler_ms:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=int, default=60)
+    parser.add_argument('--frame-length', type=int, default=512, help="Porcupine uses 512 samples")
+    parser.add_argument('--chunks', type=int, nargs='+', default=[1024, 1000, 4096, 16000],
+                        help="samples per microphone chunk")
+    main(parser.parse_args())
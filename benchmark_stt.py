@@ -0,0 +1,145 @@
+"""
+STT benchmark: replays a directory of WAV files through the STT provider of SttFactory
+(STT_PROVIDER) and reports per stream
+
+  first partial  time from the start of the stream to the first transcript update
+  final          time from the end of the audio (end of speech) to the final transcript, the
+                 committed last update the caller waits for (for Whisper up to STT_FINAL_TIMEOUT)
+  rtf            real-time factor, wall time of the stream / audio duration
+  cpu            CPU time of this process per second of audio
+
+in two modes: `realtime` sends the audio at the pace of a microphone, `fast` as fast as the
+provider takes it. With --standin a local stand-in for the Whisper server is started (see
+vocallmate/stt/stt_whisper_standin.py) so the suite runs offline; it runs in its own process,
+so its CPU time is not counted.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+from dotenv import load_dotenv
+from vocallmate.stt.stt_factory import SttFactory
+
+load_dotenv()
+
+frames_per_buffer = 1024
+
+
+async def replay(stt, path, realtime):
+    """Stream one file, return the timings of this stream."""
+    timings = {"start": time.monotonic(), "end_of_audio": None}
+    duration = 0.0
+
+    async def audio_stream():
+        nonlocal duration
+        async for chunk in stt.read_audio_file(path, frames_per_buffer):
+            seconds = len(chunk) / 2 / stt.sample_rate
+            duration += seconds
+            if realtime:
+                # the microphone delivers a chunk when it is full
+                await asyncio.sleep(seconds)
+            yield chunk
+        timings["end_of_audio"] = time.monotonic()
+
+    first_update = final_update = None
+    text = ''
+    updates = stt.transcribe_updates(audio_stream(), lambda: None, lambda: None)
+    try:
+        async for update in updates:
+            # the last update is the committed transcript
+            final_update = time.monotonic()
+            first_update = first_update or final_update
+            text = update.text
+    finally:
+        await updates.aclose()
+    end = time.monotonic()
+    end_of_audio = timings["end_of_audio"] or end
+    return {
+        "first_partial": (first_update - timings["start"]) if first_update else None,
+        "final": max(0.0, final_update - end_of_audio) if final_update else None,
+        "rtf": (end - timings["start"]) / duration if duration else None,
+        "duration": duration,
+        "text": text,
+    }
+
+
+async def run_mode(stt, files, realtime, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(path):
+        async with limit:
+            return await replay(stt, path, realtime)
+
+    cpu_start = time.process_time()
+    results = await asyncio.gather(*(run(path) for path in files))
+    cpu = time.process_time() - cpu_start
+    audio_seconds = sum(r["duration"] for r in results)
+    return results, cpu / audio_seconds if audio_seconds else 0.0
+
+
+def describe(values, scale=1000.0):
+    values = [v for v in values if v is not None]
+    if not values:
+        return f"{'-':>9}{'-':>9}"
+    values.sort()
+    p90 = values[min(len(values) - 1, int(round(0.9 * (len(values) - 1))))]
+    return f"{statistics.median(values) * scale:>9.1f}{p90 * scale:>9.1f}"
+
+
+def start_standin(port):
+    process = subprocess.Popen([sys.executable, '-m', 'vocallmate.stt.stt_whisper_standin', '--port', str(port)],
+                               stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise Exception(f"The stand-in server did not start on port {port}")
+
+
+async def main(args):
+    files = sorted(os.path.join(args.audio_dir, name) for name in os.listdir(args.audio_dir)
+                   if name.lower().endswith('.wav')) * args.repeat
+    if not files:
+        raise Exception(f"No WAV files in {args.audio_dir}")
+    standin = None
+    if args.standin:
+        standin = start_standin(args.port)
+        os.environ['STT_ENDPOINT'] = f"http://127.0.0.1:{args.port}/v1/audio/transcriptions"
+    try:
+        stt = SttFactory()
+        concurrency = args.concurrency
+        print(f"{len(files)} streams from {args.audio_dir}, {concurrency} at a time")
+        print(f"{'mode':<10}{'first partial ms':>18}{'final ms':>18}{'rtf':>18}{'cpu ms/s':>10}")
+        print(f"{'':<10}{'median':>9}{'p90':>9}{'median':>9}{'p90':>9}{'median':>9}{'p90':>9}")
+        for mode in args.modes:
+            results, cpu_per_second = await run_mode(stt, files, mode == 'realtime', concurrency)
+            print(f"{mode:<10}{describe([r['first_partial'] for r in results])}"
+                  f"{describe([r['final'] for r in results])}"
+                  f"{describe([r['rtf'] for r in results], scale=1.0)}{cpu_per_second * 1000:>10.1f}")
+            if args.verbose:
+                for path, result in zip(files, results):
+                    print(f"  {path}: {result['text']}")
+    finally:
+        if standin is not None:
+            standin.terminate()
+            standin.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio-dir', default='stt-stack', help="directory with 16 kHz mono WAV files")
+    parser.add_argument('--modes', nargs='+', choices=['realtime', 'fast'], default=['realtime', 'fast'])
+    parser.add_argument('--concurrency', type=int, default=1, help="streams at a time")
+    parser.add_argument('--repeat', type=int, default=3, help="replay every file this often")
+    parser.add_argument('--standin', action='store_true', help="start a local Whisper stand-in server")
+    parser.add_argument('--port', type=int, default=8099, help="port of the stand-in server")
+    parser.add_argument('--verbose', action='store_true', help="print the transcripts")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,39 @@
+"""
+Per-message cost of removing hallucinated phrases from Whisper transcripts: the former loop
+over all phrases with `in` and `str.replace` against the precompiled HallucinationFilter.
+"""
+import timeit
+import argparse
+from vocallmate.stt.stt_hallucination_filter import DEFAULT_PHRASES, HallucinationFilter
+
+sentence = "Hallo Computer, wie wird das Wetter morgen in Berlin und wann geht die Sonne auf? "
+
+
+def loop_filter(text, phrases):
+    for txt in phrases:
+        if txt in text:
+            text = text.replace(txt, '')
+    return text
+
+
+def main(args):
+    phrases = DEFAULT_PHRASES[args.language]
+    compiled = HallucinationFilter(phrases)
+    print(f"{len(phrases)} phrases, {args.number} messages per measurement")
+    print(f"{'chars':>8}{'loop us/msg':>14}{'regex us/msg':>14}{'speedup':>10}")
+    for length in args.lengths:
+        # a growing transcript as the server sends it, with one hallucination at the end
+        text = (sentence * (length // len(sentence) + 1))[:length] + " Untertitel der Amara.org-Community"
+        if compiled.clean(text) != loop_filter(text, phrases):
+            print(f"warning: results differ for {length} chars")
+        loop_time = timeit.timeit(lambda: loop_filter(text, phrases), number=args.number) / args.number
+        regex_time = timeit.timeit(lambda: compiled.clean(text), number=args.number) / args.number
+        print(f"{length:>8}{loop_time * 1e6:>14.2f}{regex_time * 1e6:>14.2f}{loop_time / regex_time:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--language', default='de')
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[100, 500, 2000, 10000])
+    main(parser.parse_args())
@@ -0,0 +1,57 @@
+"""
+Startup time and resident memory of the local Vosk STT with and without the shared model registry.
+
+The app creates the STT provider in several places. Before the registry every provider loaded
+its own vosk.Model, with the registry all providers share one. Each variant runs in a fresh
+process that loads the model for `--instances` providers and reports the time and the
+resident memory (VmRSS) afterwards.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def child(variant, model_path, instances):
+    import vosk
+    from vocallmate.stt.stt_model_registry import acquire_vosk_model
+    base = rss_mb()
+    start = time.monotonic()
+    if variant == 'per-provider':
+        models = [vosk.Model(model_path) for _ in range(instances)]
+    else:
+        models = [acquire_vosk_model(model_path) for _ in range(instances)]
+    print(json.dumps({"seconds": time.monotonic() - start, "rss_mb": rss_mb() - base, "models": len({id(m) for m in models})}))
+
+
+def main(args):
+    print(f"model: {args.model}, providers: {args.instances}")
+    print(f"{'variant':<14}{'models':>8}{'load s':>10}{'RSS MB':>10}")
+    for variant in ['per-provider', 'registry']:
+        out = subprocess.run([sys.executable, __file__, '--child', variant, '--model', args.model,
+                              '--instances', str(args.instances)], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{variant:<14}{result['models']:>8}{result['seconds']:>10.2f}{result['rss_mb']:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.getenv('VOSK_MODEL_PATH', './model'), help="Vosk model folder")
+    parser.add_argument('--instances', type=int, default=3,
+                        help="number of providers, the app creates 2 (HumanSpeechAgent and VocaLLMateFactory)")
+    parser.add_argument('--child', choices=['per-provider', 'registry'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.model, args.instances)
+    else:
+        main(args)
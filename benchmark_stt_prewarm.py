@@ -0,0 +1,85 @@
+"""
+Time-to-first-partial of the whisper STT provider with a cold connection (opened when the
+user starts talking) and with a warm connection (prewarmed during the wake word stage).
+
+Without --endpoint a stand-in server with --accept-delay handshake latency is started locally.
+"""
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from dotenv import load_dotenv
+from vocallmate.audio_device.audio_buffer import AudioBuffer
+from vocallmate.stt.stt_whisper_standin import WhisperStandinServer
+
+load_dotenv()
+
+frames_per_buffer = 1024
+sample_rate = 16000
+
+
+def load_wav_as_chunks(file_path):
+    with open(file_path, 'rb') as f:
+        audio = AudioBuffer.from_wav_bytes(f.read())
+    samples = audio.to_mono().resampled(sample_rate).as_int16()
+    return [samples[pos:pos + frames_per_buffer].tobytes() for pos in range(0, len(samples), frames_per_buffer)]
+
+
+async def real_time_stream(chunks):
+    # deliver the chunks at the pace of a microphone
+    for chunk in chunks:
+        await asyncio.sleep(frames_per_buffer / sample_rate)
+        yield chunk
+
+
+async def time_to_first_partial(stt, chunks) -> float:
+    start = time.monotonic()
+    transcripts = stt.transcribe_updates(real_time_stream(chunks), lambda: None, lambda: None)
+    try:
+        async for _ in transcripts:
+            return time.monotonic() - start
+    finally:
+        await transcripts.aclose()
+    raise Exception("The STT server did not send a transcript")
+
+
+async def main(args):
+    server = None
+    if args.endpoint is None:
+        server = WhisperStandinServer(accept_delay=args.accept_delay)
+        os.environ['STT_ENDPOINT'] = await server.start(port=0)
+    else:
+        os.environ['STT_ENDPOINT'] = args.endpoint
+    from vocallmate.stt.stt_whisper_remote import SpeechToTextWhisperRemote
+    stt = SpeechToTextWhisperRemote()
+    stt.prewarm_enabled = True
+    chunks = load_wav_as_chunks(args.audio)
+    print(f"endpoint: {stt.stt_endpoint}, runs: {args.runs}, wake word stage: {args.wake_word_time}s")
+    results = {}
+    for mode in ["cold", "warm"]:
+        times = []
+        for _ in range(args.runs):
+            if mode == "warm":
+                stt.prewarm()
+            # the wake word stage
+            await asyncio.sleep(args.wake_word_time)
+            times.append(await time_to_first_partial(stt, chunks))
+        results[mode] = times
+    print(f"{'connection':<12}{'mean':>10}{'median':>10}{'min':>10}{'max':>10}   (time to first partial, ms)")
+    for mode, times in results.items():
+        print(f"{mode:<12}{statistics.mean(times) * 1000:>10.1f}{statistics.median(times) * 1000:>10.1f}"
+              f"{min(times) * 1000:>10.1f}{max(times) * 1000:>10.1f}")
+    await stt.connections.close()
+    if server is not None:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint', default=None, help="STT endpoint to benchmark, default: local stand-in server")
+    parser.add_argument('--audio', default='stt-stack/audio.wav')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--wake-word-time', type=float, default=1.0, help="seconds the wake word stage takes")
+    parser.add_argument('--accept-delay', type=float, default=0.3, help="handshake latency of the stand-in server")
+    asyncio.run(main(parser.parse_args()))
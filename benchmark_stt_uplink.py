@@ -0,0 +1,98 @@
+"""
+Bandwidth and latency of the STT uplink codecs (pcm, flac).
+
+For every codec the audio file is encoded in microphone sized chunks to measure the bytes
+per second on the wire and the CPU time for encoding (satellite) and decoding (uplink proxy).
+Then the audio is streamed in real time through a local stand-in server to measure the
+time to the first partial transcript, which includes the segment buffering of the codec.
+"""
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from dotenv import load_dotenv
+from vocallmate.audio_device.audio_buffer import AudioBuffer
+from vocallmate.stt.stt_uplink_codec import create_uplink_codec
+from vocallmate.stt.stt_whisper_standin import WhisperStandinServer
+
+load_dotenv()
+
+frames_per_buffer = 1024
+sample_rate = 16000
+
+
+def load_wav_as_chunks(file_path):
+    with open(file_path, 'rb') as f:
+        audio = AudioBuffer.from_wav_bytes(f.read())
+    samples = audio.to_mono().resampled(sample_rate).as_int16()
+    return [samples[pos:pos + frames_per_buffer].tobytes() for pos in range(0, len(samples), frames_per_buffer)]
+
+
+def measure_codec(name, chunks, segment_ms):
+    codec = create_uplink_codec(name, sample_rate, segment_ms)
+    start = time.process_time()
+    messages = []
+    for chunk in chunks:
+        messages += codec.encode(chunk)
+    messages += codec.flush()
+    encode_time = time.process_time() - start
+    start = time.process_time()
+    decoded = sum(len(codec.decode(message)) for message in messages)
+    decode_time = time.process_time() - start
+    seconds = sum(len(chunk) for chunk in chunks) / 2 / sample_rate
+    if decoded != sum(len(chunk) for chunk in chunks):
+        print(f"warning: {name} decoded {decoded} bytes instead of {sum(len(chunk) for chunk in chunks)}")
+    return {
+        "kb_per_s": sum(len(message) for message in messages) / seconds / 1000,
+        "messages_per_s": len(messages) / seconds,
+        "encode_ms_per_s": encode_time / seconds * 1000,
+        "decode_ms_per_s": decode_time / seconds * 1000,
+    }
+
+
+async def real_time_stream(chunks):
+    for chunk in chunks:
+        await asyncio.sleep(frames_per_buffer / sample_rate)
+        yield chunk
+
+
+async def time_to_first_partial(stt, chunks) -> float:
+    start = time.monotonic()
+    transcripts = stt.transcribe_updates(real_time_stream(chunks), lambda: None, lambda: None)
+    try:
+        async for _ in transcripts:
+            return time.monotonic() - start
+    finally:
+        await transcripts.aclose()
+    raise Exception("The STT server did not send a transcript")
+
+
+async def main(args):
+    chunks = load_wav_as_chunks(args.audio)
+    server = WhisperStandinServer()
+    endpoint = await server.start(port=0)
+    from vocallmate.stt.stt_whisper_remote import SpeechToTextWhisperRemote
+    print(f"audio: {args.audio}, segment: {args.segment_ms} ms, runs: {args.runs}")
+    print(f"{'codec':<8}{'kB/s':>8}{'ratio':>8}{'msg/s':>8}{'enc ms/s':>10}{'dec ms/s':>10}{'first partial ms':>18}")
+    pcm_rate = None
+    for name in ["pcm", "flac"]:
+        stats = measure_codec(name, chunks, args.segment_ms)
+        pcm_rate = pcm_rate or stats["kb_per_s"]
+        os.environ['STT_ENDPOINT'] = endpoint
+        os.environ['STT_UPLINK_CODEC'] = name
+        os.environ['STT_UPLINK_SEGMENT_MS'] = str(args.segment_ms)
+        stt = SpeechToTextWhisperRemote()
+        latencies = [await time_to_first_partial(stt, chunks) for _ in range(args.runs)]
+        print(f"{name:<8}{stats['kb_per_s']:>8.2f}{stats['kb_per_s'] / pcm_rate:>8.2f}{stats['messages_per_s']:>8.1f}"
+              f"{stats['encode_ms_per_s']:>10.2f}{stats['decode_ms_per_s']:>10.2f}"
+              f"{statistics.median(latencies) * 1000:>18.1f}")
+    await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audio', default='stt-stack/audio.wav')
+    parser.add_argument('--segment-ms', type=int, default=200, help="ms of audio per compressed message")
+    parser.add_argument('--runs', type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
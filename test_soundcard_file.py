@@ -0,0 +1,59 @@
+"""
+Checks the file soundcard (AUDIO_PYTHON_BACKEND=file) without audio hardware:
+an unreadable WAV file in the input folder is skipped and the microphone goes on with the
+next file, and the playback WAV is complete after close().
+Run with `python test_soundcard_file.py` or pytest.
+"""
+import os
+import time
+import wave
+import asyncio
+import tempfile
+import numpy as np
+from vocallmate.audio_device.soundcard_file import FileSoundCard
+
+
+def write_wav(path, samples, sample_width=2, sample_rate=16000):
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+
+
+def test_file_soundcard_skips_bad_input_and_finalizes_output():
+    os.environ['AUDIO_FILE_SPEED'] = '20'
+    os.environ['AUDIO_FILE_INPUT_GAP'] = '0'
+    os.environ['AUDIO_STATS_INTERVAL'] = '0'
+    with tempfile.TemporaryDirectory() as folder:
+        # sorted by name: the 8-bit file comes first and cannot be read
+        write_wav(os.path.join(folder, 'a_8bit.wav'), np.full(16000, 200, dtype=np.uint8), sample_width=1)
+        write_wav(os.path.join(folder, 'b_tone.wav'), np.full(16000, 1000, dtype=np.int16))
+        output_path = os.path.join(folder, 'playback.wav')
+        soundcard = FileSoundCard(input_path=folder, output_path=output_path)
+
+        async def record(seconds):
+            samples = []
+            async for chunk in soundcard.get_record_stream(preroll_ms=500):
+                samples.append(np.frombuffer(chunk, dtype=np.int16))
+                if sum(len(s) for s in samples) >= seconds * soundcard.sample_rate:
+                    break
+            return np.concatenate(samples)
+
+        # a dead clock does not deliver anything, do not wait forever then
+        recorded = asyncio.run(asyncio.wait_for(record(1.0), timeout=10))
+        assert soundcard._clock_thread.is_alive(), "the clock thread has died"
+        assert np.any(recorded == 1000), "the second input file has not been captured"
+
+        soundcard.play_audio(16000, np.full(8000, 500, dtype=np.int16)).wait(timeout=5)
+        time.sleep(0.1)
+        soundcard.close()
+        with wave.open(output_path, 'rb') as wav_file:
+            frames = wav_file.readframes(wav_file.getnframes())
+        assert len(frames) == wav_file.getnframes() * 2 > 0
+        assert np.any(np.frombuffer(frames, dtype=np.int16) == 500), "the playback is missing in the output file"
+
+
+if __name__ == '__main__':
+    test_file_soundcard_skips_bad_input_and_finalizes_output()
+    print("FileSoundCard test passed")
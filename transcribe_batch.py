@@ -0,0 +1,66 @@
+"""
+Transcribe recorded WAV files in bulk, e.g. a day of captured utterances for regression checks.
+
+The files are streamed to the STT provider (STT_PROVIDER) as fast as it takes them, with a
+limited number of sessions at a time. The transcripts are written as JSON lines
+{"file": ..., "text": ...}. With --reference the transcripts are compared to an earlier
+output and the changed ones are listed.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from vocallmate.stt.stt_factory import SttFactory
+
+load_dotenv()
+
+
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith('.wav'))
+        else:
+            files.append(path)
+    return files
+
+
+def load_reference(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {entry['file']: entry['text'] for entry in map(json.loads, f) if entry}
+
+
+async def main(args):
+    files = collect_files(args.paths)
+    stt = SttFactory()
+    concurrency = args.concurrency or stt.max_concurrent_sessions
+    print(f"Transcribing {len(files)} files, up to {concurrency} at a time", file=sys.stderr)
+    start = time.time()
+    transcripts = await stt.transcribe_many(files, max_concurrent=concurrency)
+    print(f"Done in {time.time() - start:.1f}s, {sum(t is None for t in transcripts.values())} failed",
+          file=sys.stderr)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for file, text in transcripts.items():
+            out.write(json.dumps({"file": file, "text": text}, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if args.reference:
+        reference = load_reference(args.reference)
+        changed = [f for f, text in transcripts.items() if f in reference and reference[f] != text]
+        for file in changed:
+            print(f"{file}\n  was: {reference[file]}\n  now: {transcripts[file]}", file=sys.stderr)
+        print(f"{len(changed)} of {len(reference)} reference transcripts changed", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="WAV files or directories with WAV files")
+    parser.add_argument('--concurrency', type=int, default=None, help="sessions at a time")
+    parser.add_argument('--output', help="JSON lines file, default stdout")
+    parser.add_argument('--reference', help="JSON lines output of an earlier run to compare with")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+import struct
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Union
+import numpy as np
+from vocallmate.audio_device.resampler import resample_audio
+
+# WAVE_FORMAT_* codes of the fmt chunk
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass(frozen=True)
+class AudioBuffer:
+    """
+    Immutable audio clip: samples, sample rate and channel count.
+
+    `samples` is a read-only NumPy array of shape (frames,) for mono or (frames, channels).
+    The constructors wrap the decoded bytes with np.frombuffer, so no sample is copied until
+    a conversion is really needed. Each conversion method returns the buffer itself if
+    there is nothing to do, otherwise a new buffer with exactly one converted copy.
+    Because buffers are immutable they can be cached and shared between threads.
+    """
+    samples: np.ndarray
+    sample_rate: int
+    channels: int = 1
+
+    def __post_init__(self):
+        samples = self.samples
+        if self.channels > 1 and samples.ndim == 1:
+            samples = samples.reshape(-1, self.channels)
+        if samples.flags.writeable:
+            # a read-only view, the caller keeps its own array writable
+            samples = samples.view()
+            samples.setflags(write=False)
+        object.__setattr__(self, "samples", samples)
+        object.__setattr__(self, "sample_rate", int(self.sample_rate))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.samples.dtype
+
+    @property
+    def frames(self) -> int:
+        return len(self.samples)
+
+    @property
+    def duration(self) -> float:
+        """Length of the clip in seconds."""
+        return self.frames / self.sample_rate
+
+    ###########################################################################
+    #                              Constructors
+    ###########################################################################
+
+    @classmethod
+    def from_pcm(cls, data, sample_rate: int, channels: int = 1, sample_width: int = 2) -> "AudioBuffer":
+        """Wrap interleaved little endian integer PCM bytes without copying them."""
+        dtypes = {1: np.uint8, 2: np.int16, 4: np.int32}
+        if sample_width not in dtypes:
+            raise Exception(f"AudioBuffer: unsupported PCM sample width {sample_width}")
+        samples = np.frombuffer(data, dtype=dtypes[sample_width])
+        if sample_width == 1:
+            # 8-bit WAV is unsigned, this is the one format that needs a conversion up front
+            samples = ((samples.astype(np.int16) - 128) << 8).astype(np.int16)
+        return cls(samples, sample_rate, channels)
+
+    @classmethod
+    def from_wav_bytes(cls, data: Union[bytes, bytearray, memoryview, BytesIO]) -> "AudioBuffer":
+        """
+        Parse a complete WAV file held in memory. The samples are a view of the data
+        chunk of `data`, they are not copied. PCM (8, 16, 32 bit) and 32-bit float are supported.
+        """
+        if isinstance(data, BytesIO):
+            data = data.getbuffer()
+        view = memoryview(data)
+        if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+            raise Exception("AudioBuffer: not a RIFF/WAVE file")
+        fmt = None
+        pos = 12
+        while pos + 8 <= len(view):
+            chunk_id = bytes(view[pos:pos + 4])
+            chunk_size = struct.unpack_from("<I", view, pos + 4)[0]
+            body = pos + 8
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack_from("<HHIIHH", view, body)
+                if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                    # the real format code is the start of the sub format GUID
+                    fmt = struct.unpack_from("<H", view, body + 24) + fmt[1:]
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise Exception("AudioBuffer: WAV data chunk before fmt chunk")
+                # streamed WAV files (e.g. from TTS servers) may carry a placeholder size
+                end = min(body + chunk_size, len(view))
+                return cls._from_wav_data(view[body:end], fmt)
+            # chunks are padded to an even size
+            pos = body + chunk_size + (chunk_size & 1)
+        raise Exception("AudioBuffer: WAV file has no data chunk")
+
+    @classmethod
+    def _from_wav_data(cls, data: memoryview, fmt: tuple) -> "AudioBuffer":
+        format_tag, channels, sample_rate, _, block_align, bits_per_sample = fmt
+        sample_width = bits_per_sample // 8
+        # ignore a trailing partial frame
+        data = data[:len(data) - len(data) % block_align]
+        if format_tag == _WAVE_FORMAT_IEEE_FLOAT:
+            if sample_width != 4:
+                raise Exception(f"AudioBuffer: unsupported float sample width {sample_width}")
+            return cls(np.frombuffer(data, dtype=np.float32), sample_rate, channels)
+        if format_tag != _WAVE_FORMAT_PCM:
+            raise Exception(f"AudioBuffer: unsupported WAV format {format_tag}")
+        return cls.from_pcm(data, sample_rate, channels, sample_width)
+
+    @classmethod
+    def from_segment(cls, segment) -> "AudioBuffer":
+        """Wrap the raw PCM data of a pydub AudioSegment without copying it."""
+        return cls.from_pcm(segment.raw_data, segment.frame_rate, segment.channels, segment.sample_width)
+
+    @classmethod
+    def from_array(cls, samples: np.ndarray, sample_rate: int) -> "AudioBuffer":
+        """Wrap an array of shape (frames,) or (frames, channels)."""
+        channels = samples.shape[1] if samples.ndim == 2 else 1
+        return cls(samples, sample_rate, channels)
+
+    ###########################################################################
+    #                              Conversions
+    ###########################################################################
+
+    def to_mono(self) -> "AudioBuffer":
+        """Average all channels, returns self for mono buffers."""
+        if self.channels == 1:
+            return self
+        if np.issubdtype(self.dtype, np.floating):
+            mixed = self.samples.mean(axis=1, dtype=np.float32)
+        else:
+            mixed = self.samples.mean(axis=1).astype(self.dtype)
+        return AudioBuffer(mixed, self.sample_rate, 1)
+
+    def resampled(self, sample_rate: int) -> "AudioBuffer":
+        """Resample with the cached polyphase filter, returns self if the rate already matches."""
+        if int(sample_rate) == self.sample_rate:
+            return self
+        samples = self.samples
+        if samples.dtype == np.int32:
+            # the resampler returns integer input as int16
+            samples = self.as_int16()
+        return AudioBuffer(resample_audio(samples, self.sample_rate, sample_rate), sample_rate, self.channels)
+
+    def as_int16(self) -> np.ndarray:
+        """
+        Return the samples as int16: the buffer itself if it is int16 already, otherwise
+        one scaled and clipped conversion (float input is expected in -1.0..1.0).
+        """
+        samples = self.samples
+        if samples.dtype == np.int16:
+            return samples
+        if np.issubdtype(samples.dtype, np.floating):
+            return np.clip(samples * 32767, -32768, 32767).astype(np.int16)
+        if samples.dtype == np.int32:
+            return (samples >> 16).astype(np.int16)
+        return samples.astype(np.int16)
@@ -0,0 +1,114 @@
+import bisect
+from typing import Dict, Optional
+
+
+class CallbackStats:
+    """
+    Timing statistics of one audio callback direction (playback or record).
+
+    Only the audio thread calls `record`. It does a few additions and one bisect into a
+    fixed bin list, nothing is allocated per call. Other threads read the counters with
+    `snapshot`, values may be off by the one callback running at the same time.
+    """
+
+    # upper edges of the callback duration histogram bins in milliseconds, the last bin is open
+    DURATION_BINS_MS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0)
+
+    def __init__(self, name: str, sample_rate: int, status_flags: Optional[Dict[int, str]] = None):
+        """
+        :param name: label used in the log line
+        :param sample_rate: stream sample rate, used to compute the nominal callback period
+        :param status_flags: maps backend status flag bits (e.g. pyaudio.paOutputUnderflow) to counter names
+        """
+        self.name = name
+        self.sample_rate = sample_rate
+        self.status_flags = dict(status_flags or {})
+        self._bin_edges = [edge / 1000 for edge in self.DURATION_BINS_MS]
+        self.callbacks = 0
+        self.frames = 0
+        self.duration_histogram = [0] * (len(self.DURATION_BINS_MS) + 1)
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+        # largest deviation of the time between two callbacks from the nominal block period
+        self.jitter_max = 0.0
+        self.latency_last: Optional[float] = None
+        self.latency_total = 0.0
+        self.latency_count = 0
+        self.flag_counts = {name: 0 for name in self.status_flags.values()}
+        self._last_start: Optional[float] = None
+
+    def record(self, start: float, end: float, frame_count: int, latency: Optional[float] = None,
+               status_flags: int = 0):
+        """
+        Called at the end of each callback.
+
+        :param start: time.perf_counter() at the start of the callback
+        :param end: time.perf_counter() at the end of the callback
+        :param frame_count: frames handled by this callback
+        :param latency: device latency in seconds reported by the backend, if known
+        :param status_flags: backend status flags passed to the callback
+        """
+        duration = end - start
+        self.callbacks += 1
+        self.frames += frame_count
+        self.duration_total += duration
+        if duration > self.duration_max:
+            self.duration_max = duration
+        self.duration_histogram[bisect.bisect_left(self._bin_edges, duration)] += 1
+        if self._last_start is not None:
+            jitter = abs(start - self._last_start - frame_count / self.sample_rate)
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+        self._last_start = start
+        if latency is not None:
+            self.latency_last = latency
+            self.latency_total += latency
+            self.latency_count += 1
+        if status_flags:
+            for flag, name in self.status_flags.items():
+                if status_flags & flag:
+                    self.flag_counts[name] += 1
+
+    def duration_percentile_ms(self, percentile: float) -> Optional[float]:
+        """Upper bin edge below which `percentile` percent of the callback durations fall (None for the open bin)."""
+        histogram = list(self.duration_histogram)
+        total = sum(histogram)
+        if total == 0:
+            return 0.0
+        threshold = total * percentile / 100
+        count = 0
+        for index, bin_count in enumerate(histogram):
+            count += bin_count
+            if count >= threshold:
+                break
+        return self.DURATION_BINS_MS[index] if index < len(self.DURATION_BINS_MS) else None
+
+    def snapshot(self) -> dict:
+        callbacks = self.callbacks
+        return {
+            "callbacks": callbacks,
+            "frames": self.frames,
+            "duration_avg_ms": self.duration_total / callbacks * 1000 if callbacks else 0.0,
+            "duration_max_ms": self.duration_max * 1000,
+            "duration_p99_ms": self.duration_percentile_ms(99),
+            "duration_histogram": dict(zip([f"<={edge}ms" for edge in self.DURATION_BINS_MS] + [f">{self.DURATION_BINS_MS[-1]}ms"],
+                                           self.duration_histogram)),
+            "jitter_max_ms": self.jitter_max * 1000,
+            "latency_ms": self.latency_last * 1000 if self.latency_last is not None else None,
+            "latency_avg_ms": self.latency_total / self.latency_count * 1000 if self.latency_count else None,
+            **self.flag_counts,
+        }
+
+    def summary(self) -> str:
+        """One line summary for the periodic log."""
+        stats = self.snapshot()
+        p99 = stats["duration_p99_ms"]
+        line = (f"{self.name}: callbacks={stats['callbacks']} "
+                f"duration avg={stats['duration_avg_ms']:.2f}ms "
+                f"p99{'<=' + str(p99) if p99 is not None else '>' + str(self.DURATION_BINS_MS[-1])}ms "
+                f"max={stats['duration_max_ms']:.2f}ms jitter max={stats['jitter_max_ms']:.1f}ms")
+        if stats["latency_avg_ms"] is not None:
+            line += f" latency avg={stats['latency_avg_ms']:.1f}ms"
+        for name, count in self.flag_counts.items():
+            line += f" {name}={count}"
+        return line
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import numpy as np
+from typing import Optional
+
+
+class CaptureSubscription:
+    """
+    A single consumer of the capture hub. It owns a cursor (absolute sample position)
+    into the shared capture ring and is woken up on its own event loop whenever new
+    samples have been captured.
+    """
+
+    def __init__(self, hub: "CaptureHub", loop: asyncio.AbstractEventLoop, start_position: int):
+        self.hub = hub
+        self.loop = loop
+        self.position = start_position
+        self.closed = False
+        # number of samples skipped because this subscriber fell too far behind
+        self.dropped_samples = 0
+        self._wakeup = asyncio.Event()
+        self._wakeup_pending = False
+
+    def _notify(self):
+        """Called from the capture thread: schedule a wakeup on the subscriber loop (at most one pending)."""
+        if self._wakeup_pending:
+            return
+        self._wakeup_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # the subscriber event loop has been closed already
+            self.closed = True
+
+    def _wake(self):
+        self._wakeup_pending = False
+        self._wakeup.set()
+
+    async def read(self) -> Optional[bytes]:
+        """
+        Wait for and return all samples captured since the last read as raw int16 bytes.
+        Returns None when the subscription has been closed and everything has been read.
+        """
+        while True:
+            self._wakeup.clear()
+            chunk = self.hub.read(self)
+            if chunk is not None:
+                return chunk
+            if self.closed:
+                return None
+            await self._wakeup.wait()
+
+    def close(self):
+        """End this subscription, a pending read() returns None once the backlog is consumed."""
+        self.closed = True
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass
+
+
+class CaptureHub:
+    """
+    Broadcasts the microphone signal to any number of subscribers.
+
+    The capture callback writes every chunk exactly once into a preallocated int16 ring.
+    Each subscriber reads from its own cursor, so concurrent consumers (wake word,
+    barge-in detection, STT, recorder) never steal chunks from each other. A subscriber
+    that falls more than `max_backlog` samples behind skips ahead to stay bounded.
+    """
+
+    def __init__(self, capacity: int, max_backlog: Optional[int] = None):
+        self.capacity = int(capacity)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        # total number of samples ever captured, only modified by the capture thread
+        self._write_pos = 0
+        # keep a safety margin to the region the capture thread is overwriting next
+        self.max_backlog = int(max_backlog) if max_backlog is not None else self.capacity * 3 // 4
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+    @property
+    def position(self) -> int:
+        """Absolute sample position of the next sample to be captured."""
+        return self._write_pos
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def backlog(self) -> int:
+        """Samples the slowest subscriber has not read yet."""
+        return max((self._write_pos - s.position for s in self._subscribers), default=0)
+
+    def write(self, data) -> None:
+        """Capture side: append a chunk of int16 samples and wake up all subscribers."""
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples)
+        if count > self.capacity:
+            samples = samples[-self.capacity:]
+            self._write_pos += count - self.capacity
+            count = self.capacity
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if count > first:
+            self._buffer[:count - first] = samples[first:]
+        # publish the new position before notifying
+        self._write_pos += count
+        for subscription in self._subscribers:
+            subscription._notify()
+
+    def read(self, subscription: CaptureSubscription) -> Optional[bytes]:
+        """Return the samples between the subscription cursor and the write position, or None if there are none."""
+        end = self._write_pos
+        backlog = end - subscription.position
+        if backlog > self.max_backlog:
+            subscription.dropped_samples += backlog - self.max_backlog
+            subscription.position = end - self.max_backlog
+            backlog = self.max_backlog
+        if backlog <= 0:
+            return None
+        start = subscription.position % self.capacity
+        first = min(backlog, self.capacity - start)
+        if first == backlog:
+            chunk = self._buffer[start:start + backlog].tobytes()
+        else:
+            chunk = self._buffer[start:].tobytes() + self._buffer[:backlog - first].tobytes()
+        subscription.position = end
+        return chunk
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, start_position: Optional[int] = None) -> CaptureSubscription:
+        """
+        Register a new subscriber on the given event loop.
+
+        :param start_position: absolute sample position to start from, defaults to the current
+                               capture position. Older positions are clamped to the retained history.
+        """
+        if start_position is None:
+            start_position = self._write_pos
+        start_position = max(start_position, self._write_pos - self.max_backlog, 0)
+        subscription = CaptureSubscription(self, loop, start_position)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: CaptureSubscription) -> None:
+        subscription.closed = True
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def close_all(self) -> None:
+        """End all current subscriptions."""
+        with self._lock:
+            subscribers = self._subscribers
+            self._subscribers = ()
+        for subscription in subscribers:
+            subscription.close()
@@ -0,0 +1,48 @@
+import numpy as np
+from typing import Iterator, Union
+
+
+class FrameAssembler:
+    """
+    Cuts a stream of int16 PCM chunks into frames of exactly `frame_length` samples, as
+    wake word engines like Porcupine expect them.
+
+    Full frames inside a chunk are yielded as NumPy views of the chunk, without copying. Only
+    a frame that spans two chunks is assembled in a preallocated buffer of one frame, so at
+    most `frame_length` samples per chunk are copied and nothing is allocated per frame.
+    A yielded frame is only valid until the next frame is requested.
+    """
+
+    def __init__(self, frame_length: int):
+        self.frame_length = int(frame_length)
+        self._pending = np.zeros(self.frame_length, dtype=np.int16)
+        self._fill = 0
+
+    @property
+    def pending_samples(self) -> int:
+        """Samples waiting for the next chunk to complete a frame."""
+        return self._fill
+
+    def push(self, chunk: Union[bytes, bytearray, memoryview, np.ndarray]) -> Iterator[np.ndarray]:
+        """Add a chunk and yield all frames that are complete now."""
+        samples = chunk if isinstance(chunk, np.ndarray) else np.frombuffer(chunk, dtype=np.int16)
+        frame_length = self.frame_length
+        pos = 0
+        if self._fill:
+            # complete the frame started by the previous chunk
+            pos = min(frame_length - self._fill, len(samples))
+            self._pending[self._fill:self._fill + pos] = samples[:pos]
+            self._fill += pos
+            if self._fill < frame_length:
+                return
+            yield self._pending
+            self._fill = 0
+        while pos + frame_length <= len(samples):
+            yield samples[pos:pos + frame_length]
+            pos += frame_length
+        rest = len(samples) - pos
+        self._pending[:rest] = samples[pos:]
+        self._fill = rest
+
+    def reset(self):
+        self._fill = 0
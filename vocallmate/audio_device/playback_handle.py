@@ -0,0 +1,91 @@
+import threading
+from typing import Iterable, Optional
+
+
+class PlaybackHandle:
+    """
+    Handle for one item queued for playback (a complete clip or a stream of chunks).
+
+    The soundcard feeder thread writes the chunks of the item into the playback ring and
+    records where the item starts and ends in the ring. The playback callback marks the
+    handle done once the ring read position has passed the end of the item.
+    """
+
+    def __init__(self, sample_rate: int, chunks: Iterable, output_sample_rate: int, ring):
+        # sample rate of the incoming chunks
+        self.sample_rate = sample_rate
+        # sample rate of the playback stream, frames are counted at this rate
+        self.output_sample_rate = output_sample_rate
+        self.chunks = chunks
+        self.frames_written = 0
+        # milliseconds of silence the feeder appends after this item, set when it is enqueued
+        self.gap_ms = 0
+        self._ring = ring
+        self._start_position: Optional[int] = None
+        self._end_position: Optional[int] = None
+        # ring read position at which the callback skipped the rest of a cancelled item
+        self._stop_position: Optional[int] = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        # keeps the task alive that pumps an async iterator into `chunks`
+        self._pump_task = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def frames_played(self) -> int:
+        """Number of frames of this item that have been handed to the sound device so far."""
+        if self._start_position is None:
+            return 0
+        if self.done and not self.cancelled:
+            return self.frames_written
+        position = self._ring.read_position
+        if self._stop_position is not None:
+            # the skipped rest of a cancelled item has not been played
+            position = min(position, self._stop_position)
+        if self._end_position is not None:
+            position = min(position, self._end_position)
+        return max(0, position - self._start_position)
+
+    def progress(self) -> float:
+        """Seconds of this item played so far."""
+        return self.frames_played / self.output_sample_rate
+
+    def cancel(self):
+        """Stop delivering chunks of this item and skip what is already buffered."""
+        self._cancelled.set()
+        if self._pump_task is not None:
+            loop = self._pump_task.get_loop()
+            try:
+                loop.call_soon_threadsafe(self._pump_task.cancel)
+            except RuntimeError:
+                # the loop of the async producer is already closed
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the item has been played completely or has been cancelled.
+        Returns False if the timeout expired before.
+        """
+        return self._done.wait(timeout)
+
+    def _begin(self, position: int):
+        self._start_position = position
+
+    def _end(self, position: int):
+        if self._start_position is None:
+            self._start_position = position
+        self._end_position = position
+
+    def _stop(self, position: int):
+        if self._stop_position is None:
+            self._stop_position = position
+
+    def _finish(self):
+        self._done.set()
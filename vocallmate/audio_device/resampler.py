@@ -0,0 +1,38 @@
+from functools import lru_cache
+from math import gcd
+import numpy as np
+from scipy.signal import firwin, resample_poly
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> np.ndarray:
+    """
+    Design the anti-aliasing low-pass FIR filter for a rational resampling factor up/down.
+    This is the same filter scipy.signal.resample_poly designs on every call (Kaiser window,
+    beta=5.0), but it is designed only once per factor and then reused.
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0)).astype(np.float32)
+    h.setflags(write=False)
+    return h
+
+
+def resample_audio(audio_array: np.ndarray, in_sample_rate: int, out_sample_rate: int) -> np.ndarray:
+    """
+    Resample audio along the first axis with a rational polyphase resampler.
+    Integer input is returned as int16, float input is returned as float32.
+    """
+    in_sample_rate = int(in_sample_rate)
+    out_sample_rate = int(out_sample_rate)
+    if in_sample_rate == out_sample_rate:
+        return audio_array
+    divisor = gcd(in_sample_rate, out_sample_rate)
+    up = out_sample_rate // divisor
+    down = in_sample_rate // divisor
+    is_integer = np.issubdtype(audio_array.dtype, np.integer)
+    resampled = resample_poly(audio_array.astype(np.float32, copy=False), up, down, axis=0,
+                              window=_polyphase_filter(up, down))
+    if is_integer:
+        return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+    return resampled.astype(np.float32, copy=False)
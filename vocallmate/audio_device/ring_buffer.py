@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Preallocated single-producer/single-consumer ring buffer for int16 audio samples.
+
+    One thread writes (the playback feeder), one thread reads (the PortAudio callback).
+    Both positions are monotonically increasing sample counters that are only ever
+    modified by their owning thread, so no lock is needed. Reading and writing copy
+    through NumPy views of the preallocated storage; no memory is allocated per call.
+    """
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        self.capacity = int(capacity)
+        self._buffer = np.zeros(self.capacity, dtype=dtype)
+        # total number of samples ever written/read, owned by producer/consumer
+        self._write_pos = 0
+        self._read_pos = 0
+        # underrun statistics, maintained by the consumer
+        self.underrun_count = 0
+        self.underrun_samples = 0
+
+    @property
+    def write_position(self) -> int:
+        return self._write_pos
+
+    @property
+    def read_position(self) -> int:
+        return self._read_pos
+
+    def available(self) -> int:
+        """Number of samples ready to be read."""
+        return self._write_pos - self._read_pos
+
+    def free(self) -> int:
+        """Number of samples that can be written without overwriting unread data."""
+        return self.capacity - (self._write_pos - self._read_pos)
+
+    def write(self, samples) -> int:
+        """
+        Producer side: copy as many samples as fit into the ring.
+
+        :param samples: a 1-D int16 ndarray, memoryview or bytes-like object
+        :return: the number of samples written (may be less than len(samples) if the ring is full)
+        """
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=self._buffer.dtype)
+        count = min(len(samples), self.free())
+        if count <= 0:
+            return 0
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if count > first:
+            self._buffer[:count - first] = samples[first:count]
+        # publish only after the data has been copied
+        self._write_pos += count
+        return count
+
+    def write_silence(self, count: int) -> int:
+        """Producer side: append up to `count` zero samples. Returns the number written."""
+        count = min(int(count), self.free())
+        if count <= 0:
+            return 0
+        start = self._write_pos % self.capacity
+        first = min(count, self.capacity - start)
+        self._buffer[start:start + first] = 0
+        if count > first:
+            self._buffer[:count - first] = 0
+        self._write_pos += count
+        return count
+
+    def read_into(self, out: np.ndarray, active: bool = True) -> int:
+        """
+        Consumer side: fill `out` with the next samples. Samples that cannot be
+        served from the ring are zero filled.
+
+        :param out: preallocated destination array
+        :param active: True if the producer is still delivering data. A short read
+                       while active is counted as an underrun.
+        :return: the number of samples copied from the ring
+        """
+        needed = len(out)
+        count = min(needed, self.available())
+        if count > 0:
+            start = self._read_pos % self.capacity
+            first = min(count, self.capacity - start)
+            out[:first] = self._buffer[start:start + first]
+            if count > first:
+                out[first:count] = self._buffer[:count - first]
+            self._read_pos += count
+        if count < needed:
+            out[count:] = 0
+            if active:
+                self.underrun_count += 1
+                self.underrun_samples += needed - count
+        return count
+
+    def skip(self, count: int) -> int:
+        """Consumer side: drop up to `count` unread samples. Returns the number of samples dropped."""
+        dropped = max(0, min(int(count), self.available()))
+        self._read_pos += dropped
+        return dropped
+
+    def discard(self) -> int:
+        """Consumer side: drop all unread samples. Returns the number of samples dropped."""
+        return self.skip(self.available())
@@ -0,0 +1,453 @@
+import os
+import time
+import threading
+import logging
+from io import BytesIO
+import queue
+import asyncio
+import numpy as np
+from collections import deque
+from typing import AsyncGenerator, AsyncIterable, Iterable, Optional, Union
+from vocallmate.audio_device.soundcard_interface import AudioInterface
+from vocallmate.audio_device.ring_buffer import AudioRingBuffer
+from vocallmate.audio_device.capture_hub import CaptureHub
+from vocallmate.audio_device.audio_buffer import AudioBuffer
+from vocallmate.audio_device.playback_handle import PlaybackHandle
+from vocallmate.audio_device.audio_stats import CallbackStats
+
+
+class BufferedSoundCard(AudioInterface):
+    """
+    Device independent part of a soundcard backend.
+
+    Playback: play_audio/play_stream enqueue PlaybackHandles, a feeder thread writes their
+    chunks into a lock-free ring and the backend pulls blocks with `_render_playback`.
+    Recording: the backend pushes captured blocks with `_capture`, the capture hub
+    broadcasts them to all get_record_stream consumers.
+
+    Backends only have to call `_render_playback` and `_capture` from their audio
+    callbacks (or clock) with blocks of `frames_per_buffer` frames.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        # frames_per_buffer can be tuned (e.g., 512, 1024, 2048)
+        # Larger buffers are more stable (fewer underruns), but higher latency
+        self.frames_per_buffer = 1024
+        self.bytes_per_frame = 2  # 16-bit => 2 bytes
+
+        # -------------------------------------------------------------
+        #  Queues for playback and recording
+        # -------------------------------------------------------------
+        # Playback queue: items are PlaybackHandle objects. It is drained by the feeder thread,
+        # which writes the chunks of each handle into the playback ring.
+        self.playback_queue = queue.Queue()
+        # Handles written (or being written) into the ring and not yet played completely
+        self._active_handles = deque()
+        # For recording data from the callback: the capture hub keeps the last 10 seconds
+        # and broadcasts them to every get_record_stream consumer.
+        self.capture_hub = CaptureHub(capacity=self.sample_rate * self.input_channels * 10)
+        self.recording_active = threading.Event()
+
+        # Stop signals
+        self.stop_signal_playback = threading.Event()
+        self.stop_signal_record = threading.Event()
+
+        # -------------------------------------------------------------
+        #  Playback callback state
+        # -------------------------------------------------------------
+        # Lock-free SPSC ring between the feeder thread and the playback callback (2 seconds)
+        self.playback_ring = AudioRingBuffer(capacity=self.sample_rate * 2)
+        # Preallocated output frame the callback copies the ring content into
+        self._playback_frame = np.zeros(self.frames_per_buffer * self.input_channels, dtype=np.int16)
+        # Signalled whenever a handle has been played completely, see wait_until_playback_finished
+        self._playback_idle = threading.Condition()
+        self._feeder_thread = threading.Thread(target=self._playback_feeder, name="PlaybackFeeder", daemon=True)
+        self._feeder_thread.start()
+
+        # -------------------------------------------------------------
+        #  Callback instrumentation
+        # -------------------------------------------------------------
+        # Backends record each callback, see get_stats(). Backends that report
+        # xrun flags replace these with stats that know their flag bits.
+        self.playback_stats = CallbackStats("playback", self.sample_rate)
+        self.record_stats = CallbackStats("record", self.sample_rate)
+        # Seconds between two stats log lines, 0 disables the log
+        self.stats_interval = float(os.getenv('AUDIO_STATS_INTERVAL', '60'))
+        if self.stats_interval > 0:
+            threading.Thread(target=self._log_stats_periodically, name="AudioStatsLogger", daemon=True).start()
+
+    ###########################################################################
+    #                 Called from the backend audio callbacks
+    ###########################################################################
+
+    def _render_playback(self, frame_count: int) -> np.ndarray:
+        """
+        Return the next `frame_count` frames to output as an int16 view of a preallocated
+        frame. All conversion work happens in the feeder thread. Here we only copy the
+        next frames from the playback ring, missing samples are zero filled by the ring.
+        """
+        samples_needed = frame_count * self.input_channels
+        if samples_needed > len(self._playback_frame):
+            # the device asked for a larger block than configured, grow once
+            self._playback_frame = np.zeros(samples_needed, dtype=np.int16)
+        out = self._playback_frame[:samples_needed]
+        # If stop signal is set, drop everything buffered and return silence
+        if self.stop_signal_playback.is_set():
+            self.playback_ring.discard()
+            if self._active_handles:
+                while self._active_handles:
+                    self._active_handles.popleft()._finish()
+                self._notify_playback_state()
+            out[:] = 0
+            return out
+        # A short read only counts as underrun while the feeder still has items to deliver
+        self.playback_ring.read_into(out, active=self.playback_queue.unfinished_tasks > 0)
+        self._update_active_handles()
+        return out
+
+    def _capture(self, in_data) -> None:
+        """Write a block of captured int16 audio once into the capture hub."""
+        self.capture_hub.write(in_data)
+
+    def _update_active_handles(self):
+        """
+        Called from the playback callback: mark handles done whose last frame has been
+        handed to the device, and skip the buffered rest of cancelled handles.
+        """
+        ring = self.playback_ring
+        while self._active_handles:
+            handle = self._active_handles[0]
+            end = handle._end_position
+            if handle.cancelled:
+                handle._stop(ring.read_position)
+                # while the feeder is still writing it, everything in the ring belongs to this handle
+                target = end if end is not None else ring.write_position
+                if ring.read_position < target:
+                    ring.skip(target - ring.read_position)
+                if not handle.done:
+                    handle._finish()
+                    self._notify_playback_state()
+            if end is None:
+                # the feeder is still writing this handle (a cancelled one stops at its next write)
+                break
+            if ring.read_position < end:
+                break
+            self._active_handles.popleft()
+            handle._finish()
+            self._notify_playback_state()
+
+    def _notify_playback_state(self):
+        """Wake up wait_until_playback_finished callers to re-check whether playback has drained."""
+        with self._playback_idle:
+            self._playback_idle.notify_all()
+
+    def _playback_is_idle(self) -> bool:
+        """True if nothing is queued and every written item has been handed to the device."""
+        return self.playback_queue.unfinished_tasks == 0 and not self._active_handles
+
+    def _playback_feeder(self):
+        """
+        Runs in its own thread. Takes the handles from the playback queue and writes
+        their chunks into the playback ring, waiting whenever the ring is full. Chunks
+        are converted to int16 at the stream sample rate here if that has not happened
+        already. After each item a gap of `gap_ms` milliseconds of silence is added.
+        """
+        while True:
+            handle = self.playback_queue.get()
+            try:
+                if not handle.cancelled:
+                    handle._begin(self.playback_ring.write_position)
+                    self._active_handles.append(handle)
+                    completed = True
+                    for chunk in handle.chunks:
+                        if handle.cancelled:
+                            completed = False
+                            break
+                        samples = self._prepare_audio_for_playback(
+                            AudioBuffer.from_array(self._chunk_to_ndarray(chunk), handle.sample_rate)
+                        )
+                        if not self._write_to_ring(samples, handle):
+                            completed = False
+                            break
+                        handle.frames_written += len(samples) // self.input_channels
+                    handle._end(self.playback_ring.write_position)
+                    if completed and not handle.cancelled and handle.gap_ms > 0:
+                        gap_frames = int(self.sample_rate * handle.gap_ms / 1000)
+                        self._write_silence_to_ring(gap_frames * self.input_channels, handle)
+            except Exception as e:
+                self.logger.error(f"Cannot write audio to the playback ring: {e}")
+            finally:
+                if handle._end_position is None:
+                    handle._end(self.playback_ring.write_position)
+                if handle not in self._active_handles:
+                    handle._finish()
+                self.playback_queue.task_done()
+                self._notify_playback_state()
+
+    def _write_to_ring(self, samples: np.ndarray, handle: Optional[PlaybackHandle] = None) -> bool:
+        """
+        Write all samples into the playback ring, blocking while it is full.
+        Returns False if playback has been stopped or `handle` has been cancelled in the meantime,
+        the rest of the samples is not written then.
+        """
+        # Wait roughly half a callback period when the ring is full
+        wait_time = self.frames_per_buffer / self.sample_rate / 2
+        view = memoryview(samples)
+        pos = 0
+        while pos < len(samples):
+            if self.stop_signal_playback.is_set() or (handle is not None and handle.cancelled):
+                return False
+            written = self.playback_ring.write(view[pos:])
+            pos += written
+            if written == 0:
+                time.sleep(wait_time)
+        return True
+
+    def _write_silence_to_ring(self, count: int, handle: Optional[PlaybackHandle] = None) -> bool:
+        wait_time = self.frames_per_buffer / self.sample_rate / 2
+        while count > 0:
+            if self.stop_signal_playback.is_set() or (handle is not None and handle.cancelled):
+                return False
+            written = self.playback_ring.write_silence(count)
+            count -= written
+            if written == 0:
+                time.sleep(wait_time)
+        return True
+
+    ###########################################################################
+    #                 Recording Methods (Async Generator)
+    ###########################################################################
+
+    def capture_position(self) -> int:
+        return self.capture_hub.position
+
+    async def get_record_stream(self, preroll_ms: int = 0, start_position: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+        """
+        Provides an async generator that yields recorded audio data.
+        Each call subscribes to the capture hub with its own cursor, so several
+        consumers can record the same microphone concurrently. The generator ends
+        when the caller stops iterating or when stop_recording() is called.
+
+        :param preroll_ms: start this many milliseconds in the past. The capture hub is
+                           filled continuously, so audio from before the call is not lost.
+        :param start_position: start at this capture position (see capture_position()) instead,
+                               e.g. where the wake word was detected.
+        """
+        self.stop_signal_record.clear()  # Reset stop signal if it was set
+        if start_position is None:
+            preroll_samples = int(self.sample_rate * preroll_ms / 1000) * self.input_channels
+            start_position = self.capture_hub.position - preroll_samples
+        subscription = self.capture_hub.subscribe(asyncio.get_running_loop(), start_position=start_position)
+        self.recording_active.set()
+        try:
+            while True:
+                chunk = await subscription.read()
+                if chunk is None:
+                    # end of stream
+                    break
+                yield chunk
+        finally:
+            # When the caller stops iteration, or stop_recording() has been called
+            self.logger.debug("get_record_stream: generator exit.")
+            self.capture_hub.unsubscribe(subscription)
+            if subscription.dropped_samples > 0:
+                self.logger.warning(f"Record stream consumer was too slow, dropped {subscription.dropped_samples} samples")
+            if self.capture_hub.subscriber_count == 0:
+                self.recording_active.clear()
+
+    def stop_recording(self):
+        """
+        End all active record streams of all consumers. Capturing into the hub continues.
+        To end a single stream, close its generator instead.
+        """
+        self.stop_signal_record.set()
+        self.capture_hub.close_all()
+        self.logger.debug("Recording stopped and stream closed.")
+
+    ###########################################################################
+    #                          Playback Methods
+    ###########################################################################
+
+    def play_audio(self, sample_rate: int, audio_array, gap_ms: Optional[int] = None) -> PlaybackHandle:
+        """
+        Convert the audio to int16 at the stream sample rate and enqueue it for playback.
+        The conversion runs here, on the producer side, the callback only copies ready-made frames.
+
+        :param sample_rate: sample rate of audio_array, ignored for AudioBuffer objects which carry their own
+        :param audio_array: an AudioBuffer, a NumPy array (int16 or float in -1.0..1.0) or a complete
+                            WAV file as bytes or BytesIO
+        :param gap_ms: milliseconds of silence after the clip, defaults to AUDIO_PLAYBACK_GAP_MS
+        """
+        if isinstance(audio_array, AudioBuffer):
+            audio = audio_array
+        elif isinstance(audio_array, np.ndarray):
+            audio = AudioBuffer.from_array(audio_array, sample_rate)
+        elif isinstance(audio_array, (bytes, bytearray, BytesIO)):
+            # a WAV file, the samples are used in place without decoding them to float
+            audio = AudioBuffer.from_wav_bytes(audio_array)
+        else:
+            raise Exception(f"Cannot deal with objects of type {type(audio_array)}")
+        samples = self._prepare_audio_for_playback(audio)
+        self.logger.debug(f"play_audio: Adding to queue: {len(samples)} samples")
+        # the samples are ready-made, the feeder does not need to convert them again
+        return self._enqueue_playback(PlaybackHandle(self.sample_rate, [samples], self.sample_rate, self.playback_ring),
+                                      gap_ms)
+
+    def play_stream(self, sample_rate: int, chunks: Union[Iterable, AsyncIterable],
+                    gap_ms: Optional[int] = None) -> PlaybackHandle:
+        """
+        Start playback of a stream of PCM chunks as soon as the first chunk is available.
+
+        :param sample_rate: sample rate of the chunks
+        :param chunks: sync or async iterable of chunks, each a NumPy array (int16 or float in -1.0..1.0)
+                       or raw int16 PCM bytes. Async iterables are consumed on the running event loop.
+        :param gap_ms: milliseconds of silence after the stream, defaults to AUDIO_PLAYBACK_GAP_MS
+        :return: a PlaybackHandle to follow progress, cancel or wait for the end of playback
+        """
+        if hasattr(chunks, "__aiter__"):
+            chunk_queue = queue.Queue()
+            end_of_stream = object()
+
+            def drain():
+                # runs in the feeder thread
+                while (chunk := chunk_queue.get()) is not end_of_stream:
+                    yield chunk
+
+            handle = PlaybackHandle(sample_rate, drain(), self.sample_rate, self.playback_ring)
+
+            async def pump():
+                try:
+                    async for chunk in chunks:
+                        if handle.cancelled:
+                            break
+                        chunk_queue.put(chunk)
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    self.logger.error(f"play_stream: error while reading the audio stream: {e}")
+                finally:
+                    chunk_queue.put(end_of_stream)
+
+            handle._pump_task = asyncio.get_running_loop().create_task(pump())
+        else:
+            handle = PlaybackHandle(sample_rate, chunks, self.sample_rate, self.playback_ring)
+        self.logger.debug("play_stream: Adding stream to queue")
+        return self._enqueue_playback(handle, gap_ms)
+
+    def _enqueue_playback(self, handle: PlaybackHandle, gap_ms: Optional[int] = None) -> PlaybackHandle:
+        handle.gap_ms = self.playback_gap_ms if gap_ms is None else max(0, int(gap_ms))
+        # If we previously set stop_signal_playback, clear it:
+        if self.stop_signal_playback.is_set():
+            self.logger.debug("play_audio:Unblock playback with play_audio function")
+            self.stop_signal_playback.clear()
+        self.playback_queue.put(handle)
+        return handle
+
+    def _chunk_to_ndarray(self, chunk) -> np.ndarray:
+        if isinstance(chunk, np.ndarray):
+            return chunk
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            # raw int16 PCM
+            return np.frombuffer(chunk, dtype=np.int16)
+        raise Exception(f"Cannot deal with chunks of type {type(chunk)}")
+
+    def stop_playback(self):
+        """
+        Signal the playback callback to stop immediately, clear the queue, and close the stream.
+        """
+        self.stop_signal_playback.set()
+        for handle in list(self._active_handles):
+            handle.cancel()
+        # Clear the queue, the callback drops what is left in the playback ring
+        while not self.playback_queue.empty():
+            try:
+                handle = self.playback_queue.get_nowait()
+                handle.cancel()
+                handle._finish()
+                self.playback_queue.task_done()
+            except queue.Empty:
+                break
+        self._notify_playback_state()
+        #if self.playback_stream.is_active():
+        #    self.playback_stream.stop_stream()
+        #self.playback_stream.close()
+        self.logger.debug("Playback stopped and stream closed.")
+
+    def get_underrun_stats(self) -> dict:
+        """
+        Return the playback underrun counters of the ring buffer. An underrun is a callback
+        that could not be served completely while audio was still queued for playback.
+        """
+        return {
+            "underrun_count": self.playback_ring.underrun_count,
+            "underrun_frames": self.playback_ring.underrun_samples // self.input_channels,
+            "buffered_frames": self.playback_ring.available() // self.input_channels,
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Return the callback timing statistics of both directions together with the current
+        queue depths. Use it to tune frames_per_buffer: growing xrun counters or callback
+        durations close to the block period ask for larger buffers.
+        """
+        return {
+            "frames_per_buffer": self.frames_per_buffer,
+            "block_period_ms": self.frames_per_buffer / self.sample_rate * 1000,
+            "playback": self.playback_stats.snapshot(),
+            "record": self.record_stats.snapshot(),
+            "playback_queue_depth": self.playback_queue.unfinished_tasks,
+            "playback_active_items": len(self._active_handles),
+            "capture_subscribers": self.capture_hub.subscriber_count,
+            "capture_backlog_frames": self.capture_hub.backlog() // self.input_channels,
+            **self.get_underrun_stats(),
+        }
+
+    def _log_stats_periodically(self):
+        while True:
+            time.sleep(self.stats_interval)
+            try:
+                stats = self.get_stats()
+                self.logger.info(f"Audio stats (frames_per_buffer={self.frames_per_buffer}): "
+                                 f"{self.playback_stats.summary()}; {self.record_stats.summary()}; "
+                                 f"queue={stats['playback_queue_depth']} "
+                                 f"buffered={stats['buffered_frames']} frames "
+                                 f"underruns={stats['underrun_count']} "
+                                 f"capture backlog={stats['capture_backlog_frames']} frames")
+            except Exception as e:
+                self.logger.error(f"Cannot log audio stats: {e}")
+
+    def wait_until_playback_finished(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the playback queue is empty and every queued item has been handed to the
+        sound device. The silence gap after the last item is not waited for. The playback
+        callback and the feeder signal every change, so this returns without polling delay.
+
+        :return: False if the timeout expired before playback had drained
+        """
+        self.logger.debug("waiting for playback is finished")
+        with self._playback_idle:
+            drained = self._playback_idle.wait_for(self._playback_is_idle, timeout)
+        self.logger.debug("waiting for playback finished is done")
+        return drained
+
+    ###########################################################################
+    #          Audio Format Conversion / Utilities for Playback
+    ###########################################################################
+
+    def _prepare_audio_for_playback(self, audio: AudioBuffer) -> np.ndarray:
+        """
+        Convert an audio buffer to match the playback stream:
+          - Mix down to mono for a mono stream
+          - Resample to the stream sample rate if needed, using a polyphase
+            resampler whose filter is cached per rate pair
+          - Convert to 16-bit integer if needed
+        Every step is skipped if there is nothing to do, so int16 input at the stream
+        rate is returned as a flat view without any copy. The only copy is the write
+        into the playback ring.
+        """
+        if self.input_channels == 1:
+            audio = audio.to_mono()
+        samples = audio.resampled(self.sample_rate).as_int16()
+        return samples.reshape(-1)
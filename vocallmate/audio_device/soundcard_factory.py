@@ -15,6 +15,10 @@ def SoundcardFactory():
                 match provider_name:
                     case 'pyaudio':
                         from vocallmate.audio_device.soundcard_pyaudio import SoundCard
+                    case 'file':
+                        from vocallmate.audio_device.soundcard_file import FileSoundCard as SoundCard
+                    case 'null':
+                        from vocallmate.audio_device.soundcard_file import NullSoundCard as SoundCard
                     case _:
                         raise Exception(f"SoundcardFactory: unknown provider name {provider_name}")
 
@@ -0,0 +1,203 @@
+import os
+import glob
+import atexit
+import json
+import time
+import wave
+import logging
+import threading
+import numpy as np
+from typing import Iterator, List, Optional
+from vocallmate.audio_device.soundcard_buffered import BufferedSoundCard
+from vocallmate.audio_device.resampler import resample_audio
+from vocallmate.audio_device.audio_stats import CallbackStats
+
+
+class FileSoundCard(BufferedSoundCard):
+    """
+    Headless soundcard backend for benchmarks and replay on machines without audio hardware.
+
+    A clock thread replaces the PortAudio callbacks. Every block period it
+      - feeds the next block of the input WAV files into the capture hub (microphone),
+      - pulls the next block from the playback ring and appends it to the output WAV sink.
+    Input files are separated by `AUDIO_FILE_INPUT_GAP` seconds of silence, after the last
+    file silence is captured (or the files are replayed if `AUDIO_FILE_LOOP=true`).
+    The clock runs at `AUDIO_FILE_SPEED` times real-time.
+
+    Input and playback events are written as JSON lines next to the output file
+    (`<output>.events.jsonl`) with stream time and wall clock time. `playback_start` events
+    carry the latency since the end of the last input file, which is the audio-to-audio
+    latency of one voice turn.
+    """
+
+    def __init__(self, input_path: Optional[str] = None, output_path: Optional[str] = None):
+        super().__init__()
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.input_path = input_path if input_path is not None else os.getenv('AUDIO_FILE_INPUT', 'stt-stack/audio.wav')
+        self.output_path = output_path if output_path is not None else os.getenv('AUDIO_FILE_OUTPUT', 'playback.wav')
+        self.speed = float(os.getenv('AUDIO_FILE_SPEED', '1.0'))
+        if self.speed <= 0:
+            raise Exception(f"FileSoundCard: AUDIO_FILE_SPEED must be positive, got {self.speed}")
+        # the clock period is shortened by the speed factor, measure the jitter against it
+        self.playback_stats = CallbackStats("playback", int(self.sample_rate * self.speed))
+        self.record_stats = CallbackStats("record", int(self.sample_rate * self.speed))
+        self.input_gap_seconds = float(os.getenv('AUDIO_FILE_INPUT_GAP', '2.0'))
+        self.loop_input = os.getenv('AUDIO_FILE_LOOP', 'false').lower() == 'true'
+        self.input_files = self._find_input_files(self.input_path)
+        # number of frames the clock has processed so far
+        self.stream_frames = 0
+        self._last_input_end: Optional[float] = None
+        self._playing = False
+
+        self._output_wav = None
+        self._events_file = None
+        if self.output_path:
+            self._output_wav = wave.open(self.output_path, 'wb')
+            self._output_wav.setnchannels(self.input_channels)
+            self._output_wav.setsampwidth(self.bytes_per_frame)
+            self._output_wav.setframerate(self.sample_rate)
+            self._events_file = open(f"{self.output_path}.events.jsonl", 'w')
+
+        self._stop_clock = threading.Event()
+        self._clock_thread = threading.Thread(target=self._run_clock, name="FileSoundCardClock", daemon=True)
+        self._clock_thread.start()
+        # the header of the output WAV is only complete after close()
+        atexit.register(self.close)
+
+    ###########################################################################
+    #                      Clock replacing the audio callbacks
+    ###########################################################################
+
+    def _run_clock(self):
+        period = self.frames_per_buffer / self.sample_rate / self.speed
+        silence = np.zeros(self.frames_per_buffer * self.input_channels, dtype=np.int16)
+        blocks = self._input_blocks()
+        next_time = time.monotonic()
+        while not self._stop_clock.is_set():
+            try:
+                block = next(blocks, silence)
+                start = time.perf_counter()
+                self._capture(block.tobytes())
+                end = time.perf_counter()
+                self.record_stats.record(start, end, self.frames_per_buffer)
+                out = self._render_playback(self.frames_per_buffer)
+                self.playback_stats.record(end, time.perf_counter(), self.frames_per_buffer)
+                self._sink_playback(out)
+            except Exception as e:
+                # a dead clock would stop the microphone and the playback for good
+                self.logger.error(f"FileSoundCard clock: {e}", exc_info=True)
+            self.stream_frames += self.frames_per_buffer
+            next_time += period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _input_blocks(self) -> Iterator[np.ndarray]:
+        """Yield microphone blocks of exactly frames_per_buffer frames."""
+        block_samples = self.frames_per_buffer * self.input_channels
+        gap = np.zeros(int(self.input_gap_seconds * self.sample_rate) * self.input_channels, dtype=np.int16)
+        while True:
+            loaded = 0
+            for file_name in self.input_files:
+                try:
+                    samples = np.concatenate([gap, self._load_input_file(file_name)])
+                except Exception as e:
+                    self.logger.error(f"FileSoundCard: skipping input file {file_name}: {e}")
+                    continue
+                loaded += 1
+                # pad to full blocks
+                samples = np.pad(samples, (0, -len(samples) % block_samples))
+                self._log_event("input_start", file=file_name)
+                for pos in range(0, len(samples), block_samples):
+                    yield samples[pos:pos + block_samples]
+                self._last_input_end = self.stream_time
+                self._log_event("input_end", file=file_name)
+            if not self.loop_input or loaded == 0:
+                return
+
+    def _sink_playback(self, out: np.ndarray):
+        playing = bool(np.any(out))
+        if playing and not self._playing:
+            latency = None
+            if self._last_input_end is not None:
+                latency = round(self.stream_time - self._last_input_end, 3)
+            self._log_event("playback_start", latency_since_input_end=latency)
+        elif not playing and self._playing:
+            self._log_event("playback_end")
+        self._playing = playing
+        if self._output_wav is not None:
+            self._output_wav.writeframes(out.tobytes())
+
+    @property
+    def stream_time(self) -> float:
+        """Seconds of audio the clock has processed so far."""
+        return self.stream_frames / self.sample_rate
+
+    def _log_event(self, event: str, **kwargs):
+        entry = {"event": event, "stream_time": round(self.stream_time, 3), "wall_time": time.time(), **kwargs}
+        self.logger.info(f"{event}: {kwargs}")
+        if self._events_file is not None:
+            self._events_file.write(json.dumps(entry) + "\n")
+            self._events_file.flush()
+
+    ###########################################################################
+    #                              Input files
+    ###########################################################################
+
+    def _find_input_files(self, path: str) -> List[str]:
+        if not path:
+            return []
+        if os.path.isdir(path):
+            return sorted(glob.glob(os.path.join(path, "*.wav")))
+        if not os.path.isfile(path):
+            raise Exception(f"FileSoundCard: input file or folder {path} not found")
+        return [path]
+
+    def _load_input_file(self, file_name: str) -> np.ndarray:
+        """Read a 16-bit WAV file as int16 samples in the stream format (mono, stream sample rate)."""
+        with wave.open(file_name, 'rb') as wav_file:
+            if wav_file.getsampwidth() != 2:
+                raise Exception(f"FileSoundCard: only 16-bit WAV files are supported, {file_name} is not")
+            channels = wav_file.getnchannels()
+            sample_rate = wav_file.getframerate()
+            samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        return resample_audio(samples, sample_rate, self.sample_rate)
+
+    ###########################################################################
+    #                      Device Selection and Validation
+    ###########################################################################
+
+    def list_devices(self):
+        print("\nMicrophone (Input) Files:")
+        for file_name in self.input_files:
+            print(f" - {file_name}")
+        print(f"\nPlayback (Output) File: {self.output_path or '-'}\n")
+
+    def is_valid_device_index(self, index, input_device=True):
+        return True
+
+    def close(self):
+        """Stop the clock and finalize the output files, called at exit at the latest."""
+        self._stop_clock.set()
+        self._clock_thread.join(timeout=5.0)
+        if self._output_wav is not None:
+            self._output_wav.close()
+            self._output_wav = None
+        if self._events_file is not None:
+            self._events_file.close()
+            self._events_file = None
+
+    def config_str(self):
+        return (f'Soundcard files: microphone={self.input_path or "-"}, playback: {self.output_path or "-"}, '
+                f'speed={self.speed}')
+
+
+class NullSoundCard(FileSoundCard):
+    """
+    Soundcard backend that records silence and discards all playback.
+    """
+
+    def __init__(self):
+        super().__init__(input_path='', output_path='')
@@ -2,7 +2,8 @@ import os
 import threading
 from abc import ABC, abstractmethod
 import numpy as np
-from typing import BinaryIO, List, Callable, Generator, AsyncGenerator
+from typing import BinaryIO, List, Callable, Generator, AsyncGenerator, AsyncIterable, Iterable, Optional, Union
+from vocallmate.audio_device.playback_handle import PlaybackHandle
 
 
 class AudioInterface(ABC):
@@ -36,6 +37,10 @@ class AudioInterface(ABC):
             self.audio_playback_device = None
         self.stop_signal_record = threading.Event()
         self.start_signal_record = threading.Event()
+        # Milliseconds before the wake word detection a speech recording starts with
+        self.preroll_ms = int(os.getenv('AUDIO_PREROLL_MS', '300'))
+        # Milliseconds of silence between two played clips (can be overridden per clip)
+        self.playback_gap_ms = int(os.getenv('AUDIO_PLAYBACK_GAP_MS', '100'))
 
     @abstractmethod
     def list_devices(self) -> None:
@@ -57,15 +62,23 @@ class AudioInterface(ABC):
         pass
 
     @abstractmethod
-    async def get_record_stream(self)  -> AsyncGenerator[bytes, None]:
+    async def get_record_stream(self, preroll_ms: int = 0, start_position: Optional[int] = None)  -> AsyncGenerator[bytes, None]:
         """
         Open a recording stream (or equivalent object) for capturing audio from the currently selected microphone device.
 
+        :param preroll_ms: milliseconds of already captured audio the stream starts with.
+        :param start_position: capture position (see capture_position()) the stream starts at,
+                               instead of now minus `preroll_ms`.
         :return: A stream or device handle suitable for reading raw audio data frames.
         :raises RuntimeError: If no valid microphone device is configured.
         """
         pass
 
+    @abstractmethod
+    def capture_position(self) -> int:
+        """Number of samples captured so far, a position to start a record stream at later."""
+        pass
+
     @abstractmethod
     def stop_recording(self):
         pass
@@ -75,11 +88,30 @@ class AudioInterface(ABC):
         pass
 
     @abstractmethod
-    def play_audio(self, sample_rate, audio_buffer):
+    def play_audio(self, sample_rate, audio_buffer, gap_ms: Optional[int] = None) -> PlaybackHandle:
+        pass
+
+    @abstractmethod
+    def play_stream(self, sample_rate: int, chunks: Union[Iterable, AsyncIterable],
+                    gap_ms: Optional[int] = None) -> PlaybackHandle:
+        """
+        Play a stream of PCM chunks while it is still being produced (decoded or downloaded).
+        Output starts as soon as the first chunk is available.
+
+        :param sample_rate: sample rate of the chunks
+        :param chunks: sync or async iterable of NumPy arrays or raw int16 PCM bytes
+        :param gap_ms: milliseconds of silence after the stream, defaults to AUDIO_PLAYBACK_GAP_MS
+        :return: a PlaybackHandle with progress(), cancel() and wait()
+        """
         pass
 
     @abstractmethod
-    def wait_until_playback_finished(self):
+    def wait_until_playback_finished(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything queued for playback has been played.
+
+        :return: False if the timeout expired before
+        """
         pass
 
     def config_str(self):
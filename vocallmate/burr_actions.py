@@ -144,18 +144,19 @@ async def choose_mode(state: State) -> AsyncGenerator[Tuple[dict, Optional[State
     full_text = state["transcription_input"]
     # make easy check if input is a valid sentence at all
     if not is_sane_input_german(full_text) or len(full_text.strip())<3:
-        # if we got no useful string then directly return
+        # if we got no useful string then directly return, the speculation is not needed
+        factory.mode_classifier.cancel()
         yield {"input_ok": False}, state.update(input_ok=False)
+        return
     # We have some text input, now decide what mode we need using the LLM
     prompt_manager = factory.llm_provider.get_prompt_manager()
     prompt_manager.set_mode(Mode.MODUS_SELECTION)
     prompt_manager.empty_history()
     prompt_manager.add_user_entry(full_text)
     print(prompt_manager.pretty_print_history())
-    full_res = ''
-    async for res in factory.llm_provider.chat(prompt_manager.get_history()):
-        print(f"{res}")
-        full_res += res
+    # usually already classified while the user was talking (see get_user_speak_input)
+    full_res = await factory.mode_classifier.classify(full_text)
+    print(f"{full_res}")
     try:
         # check for uppercase mode name
         m = get_mode_from_str(full_res)
@@ -189,6 +190,8 @@ async def get_user_speak_input(state: State, wait_for_wakeword: bool = True) ->
     mode = state[StateKeys.mode.name]
     title(f"get_user_speak_input: recording and transcribe. wake word={wait_for_wakeword} mode={mode}")
     full_text = ''
+    # a speculation of an earlier transcript that has not been classified (choose_mode not reached)
+    factory.mode_classifier.cancel()
     try:
         factory.tts_provider.wait_until_done()
         # wait for wakeword, then stream the wave to the STT provider and steam back the transcription
@@ -196,11 +199,15 @@ async def get_user_speak_input(state: State, wait_for_wakeword: bool = True) ->
                 wait_for_wakeword=wait_for_wakeword
             ):
             full_text += text
+            # start the mode selection on the stable words while the user is still talking
+            if mode == Mode.MODUS_SELECTION.name:
+                factory.mode_classifier.speculate(full_text)
             yield {"transcription_input": text}, None
     except KeyboardInterrupt as e:
         raise e
     except BaseException as e:
         logger.error("got error", exc_info=True)
+        factory.mode_classifier.cancel()
     # when all is done update state
     yield {"transcription_input": full_text}, state.update(transcription_input=full_text)
 
@@ -208,6 +215,8 @@ async def get_user_speak_input(state: State, wait_for_wakeword: bool = True) ->
 async def check_if_input_is_garbage(state: State) -> AsyncGenerator[Tuple[dict, Optional[State]], None]:
     input_str = state[StateKeys.transcription_input.name]
     input_ok = is_sane_input_german(input_str)
+    # this transcript does not go to the mode selection
+    factory.mode_classifier.cancel()
     title(f"check_if_input_is_garbage: {input_str}, input_ok={input_ok}")
     yield {"input_ok": input_ok}, state.update(input_ok=input_ok)
 
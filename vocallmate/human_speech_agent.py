@@ -1,19 +1,21 @@
 import random
+import asyncio
 import threading
 import time
 import os
-import io
 import hashlib
 import logging
 from pydub import AudioSegment
-from typing import AsyncGenerator, Tuple
+from typing import AsyncGenerator, Optional, Tuple
 from vocallmate.audio_device.soundcard_factory import SoundcardFactory
+from vocallmate.audio_device.audio_buffer import AudioBuffer
+from vocallmate.audio_device.playback_handle import PlaybackHandle
 from vocallmate.interrupt_speech_thread import InterruptSpeechThread
 from vocallmate.stt.stt_factory import SttFactory
+from vocallmate.stt.stt_endpointer import SpeechEndpointer
 from vocallmate.tts.tts_factory import TtsFactory
 from vocallmate.voice_activated_recording.va_factory import VoiceActivatedRecordingFactory
 from tqdm import tqdm
-import soundfile as sf
 
 format_string = (
     "%(asctime)s - [Logger: %(name)s] - %(levelname)s - %(filename)s:%(lineno)d in %(funcName)s() - %(message)s"
@@ -44,9 +46,18 @@ class HumanSpeechAgent:
         self.soundcard = SoundcardFactory()
         self.voice_activator = VoiceActivatedRecordingFactory()
         self.tts_provider = TtsFactory()
-        self.silence_lead_time = 2
-        self.max_recording_time = 15
+        # seconds the user has to start talking, seconds of silence that end the utterance,
+        # and the maximum length of one recording
+        self.silence_lead_time = float(os.getenv('STT_LEAD_TIME', '2.0'))
+        self.trailing_silence_time = int(os.getenv('STT_TRAILING_SILENCE_MS', '800')) / 1000
+        self.max_recording_time = float(os.getenv('STT_MAX_RECORDING_TIME', '15'))
+        # milliseconds the beep is still captured after its playback has ended (output latency, echo)
+        self.beep_echo_ms = 200
         self.stt_provider = SttFactory()
+        self.endpointer = SpeechEndpointer(sample_rate=self.soundcard.sample_rate,
+                                           lead_time=self.silence_lead_time,
+                                           trailing_silence=self.trailing_silence_time,
+                                           max_duration=self.max_recording_time)
         self.stop_signal = threading.Event()
         self.abort_speech_choices = ["Anwort abgebrochen, was soll ich tun?"]
         self.hi_choices = [
@@ -75,37 +86,39 @@ class HumanSpeechAgent:
             "Das war unverständlich, bitte wiederholen"
         ]
         self.explain_sentence = "Sag das wort computer um zu starten."
+        # decoded sound files by path, see _load_mp3
+        self._audio_cache = {}
         self._warmup_cache()
 
     def engage_input_beep(self):
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio("sounds/deskviewerbeep.mp3")
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        audio = self._load_mp3("sounds/deskviewerbeep.mp3")
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
-    def beep_positive(self):
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio("sounds/computerbeep_26.mp3")
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+    def beep_positive(self) -> PlaybackHandle:
+        audio = self._load_mp3("sounds/computerbeep_26.mp3")
+        return self.soundcard.play_audio(audio.sample_rate, audio)
 
     def beep_error(self):
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio("sounds/denybeep1.mp3")
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        audio = self._load_mp3("sounds/denybeep1.mp3")
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def processing_sound(self):
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio("sounds/processing.mp3")
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        audio = self._load_mp3("sounds/processing.mp3")
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def say_abort_speech(self):
         self.tts_provider.set_stop_signal()
         self.tts_provider.soundcard.stop_playback()
         hi_phrase = random.choice(self.abort_speech_choices)
         mp3_path = self._get_cache_file_name(hi_phrase)
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio(mp3_path)
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        audio = self._load_mp3(mp3_path)
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def say_init_greeting(self):
         hi_phrase = random.choice(self.init_greetings)
         mp3_path = self._get_cache_file_name(hi_phrase)
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio(mp3_path)
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        audio = self._load_mp3(mp3_path)
+        self.soundcard.play_audio(audio.sample_rate, audio)
         self.tts_provider.speak(f"Ich höre auf den Namen {self.voice_activator.wakeword}")
         self.tts_provider.wait_until_done()
         self.soundcard.wait_until_playback_finished()
@@ -113,26 +126,26 @@ class HumanSpeechAgent:
     def say_hi(self):
         hi_phrase = random.choice(self.hi_choices)
         mp3_path = self._get_cache_file_name(hi_phrase)
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio(mp3_path)
+        audio = self._load_mp3(mp3_path)
         self.logger.info(f"say_hi: {hi_phrase}")
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def say_bye(self, message: str = ''):
         bye_phrase = random.choice(self.bye_choices)
         mp3_path = self._get_cache_file_name(bye_phrase)
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio(mp3_path)
+        audio = self._load_mp3(mp3_path)
         self.logger.info(f"say_bye: {message}{bye_phrase}")
         if message != '':
             self.tts_provider.speak(message)
         self.tts_provider.wait_until_done()
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def say_did_not_understand(self):
         did_not_understand_phrase = random.choice(self.did_not_understand)
         mp3_path = self._get_cache_file_name(did_not_understand_phrase)
-        sample_rate, audio_buffer = self._load_mp3_to_wav_bytesio(mp3_path)
+        audio = self._load_mp3(mp3_path)
         self.logger.info(f"say_did_not_understand: {did_not_understand_phrase}")
-        self.soundcard.play_audio(sample_rate, audio_buffer)
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def say(self, message: str):
         self.logger.debug(f"say: {message}")
@@ -149,20 +162,35 @@ class HumanSpeechAgent:
 
     def wait_until_talking_finished(self):
         self.logger.info("block_until_talking_finished: blocking")
-        c = 0
-        while c < 2:
-            c+=1
-            self.tts_provider.wait_until_done()
-            self.tts_provider.soundcard.wait_until_playback_finished()
+        # all sentences are in the playback queue once the TTS provider is done
+        self.tts_provider.wait_until_done()
+        self.tts_provider.soundcard.wait_until_playback_finished()
         self.logger.info("block_until_talking_finished: unblocking")
 
     async def get_human_input(self, wait_for_wakeword: bool = True) -> AsyncGenerator[str, None]:
+        start_position = mute = None
         if wait_for_wakeword:
-            self.soundcard.stop_recording()
+            # no stop_recording() here: it would end the record streams of all consumers of the
+            # capture hub, every consumer closes its own stream when it is done
             self.soundcard.wait_until_playback_finished()
             self.engage_input_beep()
             await self.voice_activator.listen_for_wake_word(stop_signal=None)
-            self.beep_positive()
+            # open the STT connection while the beep is played; not before the wake word, the
+            # server drops idle connections and the wake word stage can last for hours
+            self.stt_provider.prewarm()
+            # start the recording right after the wake word, not after the beep, so the user
+            # does not have to pause after it: at the detection, minus the time the provider
+            # needs to detect it and the pre-roll
+            if self.voice_activator.detection_position is not None:
+                preroll_ms = self.soundcard.preroll_ms + self.voice_activator.detection_lag_ms
+                start_position = (self.voice_activator.detection_position
+                                  - int(self.soundcard.sample_rate * preroll_ms / 1000) * self.soundcard.input_channels)
+            # the beep must not reach the STT: silence what the microphone captures while it is played
+            beep_start = self.soundcard.capture_position()
+            await asyncio.to_thread(self.beep_positive().wait, 5.0)
+            mute = (beep_start, self.soundcard.capture_position()
+                    + int(self.soundcard.sample_rate * self.beep_echo_ms / 1000) * self.soundcard.input_channels)
+
 
         def on_close_ws_callback():
             self.logger.debug("get_human_input.on_close_ws_callback: websocket closed")
@@ -171,16 +199,25 @@ class HumanSpeechAgent:
             self.logger.debug("on_ws_open: Should say_hi now ws is opened:")
 
         async for text in self.stt_provider.transcribe_stream(
-            audio_stream=self.start_recording(),
+            # the endpointer ends the audio stream when the user stops talking
+            audio_stream=self.endpointer.stream(self.start_recording(start_position=start_position, mute=mute)),
             websocket_on_close=on_close_ws_callback,
             websocket_on_open=on_ws_open
         ):
             yield text
         self.logger.debug("get_human_input: finished")
 
-    async def start_recording(self) -> AsyncGenerator[bytes, None]:
-        self.logger.info("start_recording: Recording...")
-        async for wav_chunk in self.soundcard.get_record_stream():
+    async def start_recording(self, start_position: Optional[int] = None,
+                              mute: Optional[Tuple[int, int]] = None) -> AsyncGenerator[bytes, None]:
+        """
+        Record from `start_position` (capture position, default now), the capture positions
+        in the range `mute` are replaced by silence.
+        """
+        self.logger.info(f"start_recording: Recording (from capture position {start_position})...")
+        position = start_position
+        async for wav_chunk in self.soundcard.get_record_stream(start_position=start_position):
+            if mute is not None and position is not None:
+                wav_chunk, position = _mute(wav_chunk, position, *mute), position + len(wav_chunk) // 2
             yield wav_chunk
 
     def _warmup_cache(self):
@@ -202,18 +239,14 @@ class HumanSpeechAgent:
         hash_str = hash_obj.hexdigest()[:8]
         return os.path.join("tts_cache/", f"{hash_str}.mp3")
 
-    def _load_mp3_to_wav_bytesio(self, mp3_path: str) -> Tuple[int, io.BytesIO]:
-        # Load the MP3 file into an AudioSegment
-        audio_segment = AudioSegment.from_mp3(mp3_path)
-        # Create a BytesIO buffer to hold WAV data
-        wav_bytes = io.BytesIO()
-        # Export the audio segment as WAV into the BytesIO buffer
-        audio_segment.export(wav_bytes, format="wav")
-        # Reset the buffer's position to the beginning
-        wav_bytes.seek(0)
-        # convert to ndarray
-        data, sample_rate = sf.read(wav_bytes, dtype='float32')
-        return sample_rate, data
+    def _load_mp3(self, mp3_path: str) -> AudioBuffer:
+        # Decoded clips are immutable, so beeps and cached phrases are decoded only once
+        audio = self._audio_cache.get(mp3_path)
+        if audio is None:
+            # Load the MP3 file into an AudioSegment and wrap its PCM data without copying it
+            audio = AudioBuffer.from_segment(AudioSegment.from_mp3(mp3_path))
+            self._audio_cache[mp3_path] = audio
+        return audio
 
     def start_speech_interrupt_thread(self, ext_stop_signal: threading.Event):
         def stop_speech():
@@ -238,4 +271,15 @@ class HumanSpeechAgent:
             self.interrupt_speech_thread = None
             self.logger.info("Speech interrupt thread stopped.")
         else:
-            self.logger.info("No speech interrupt thread is currently running.")
\ No newline at end of file
+            self.logger.info("No speech interrupt thread is currently running.")
+
+
+def _mute(chunk: bytes, position: int, start: int, end: int) -> bytes:
+    """Zero the samples of `chunk`, which starts at capture `position`, between `start` and `end`."""
+    first = max(start - position, 0)
+    last = min(end - position, len(chunk) // 2)
+    if first >= last:
+        return chunk
+    muted = bytearray(chunk)
+    muted[first * 2:last * 2] = bytes((last - first) * 2)
+    return bytes(muted)
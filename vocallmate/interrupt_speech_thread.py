@@ -60,7 +60,11 @@ class InterruptSpeechThread:
         """
         # Perform the thread's tasks here
         self.logger.debug(f"Listen for {self.voice_activation.wakeword} as speech interrupt word")
-        asyncio.run(self.voice_activation.listen_for_wake_word(self._stop_event))
+        detected = asyncio.run(self.voice_activation.listen_for_wake_word(self._stop_event))
+        if not detected:
+            # stop() has been called, or the provider gave up without hearing the wake word
+            self.logger.info("Worker thread loop is exiting, no wake word.")
+            return
         self.logger.info(f"Interrupt speech. Detected wake word \"{self.voice_activation.wakeword}\" as speech interrupt word")
         self._stop_event.set()
         self.stop_callback()
@@ -0,0 +1,145 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from vocallmate.llm.llm_interface import LmmInterface
+from vocallmate.llm.llm_prompt_manager_interface import Mode, GLOBAL_BASE_TEMPLATES
+
+
+@dataclass
+class _Speculation:
+    text: str
+    task: asyncio.Task
+    cancelled: threading.Event
+    started: float = field(default_factory=time.monotonic)
+
+
+class ModeClassifier:
+    """
+    Runs the MODUS_SELECTION LLM call, speculatively while the user is still talking.
+
+    `speculate()` is called with the stable part of the transcript whenever it grows. It starts
+    the classification in the background, and starts it again only when the text has changed
+    materially: at least MODE_SPECULATION_MIN_NEW_WORDS words more, or earlier words revised.
+    At most one LLM request is in flight. An outdated one is told to stop at its next chunk and
+    the newest text is classified once it has finished, requests are never left running
+    in the background. `classify()` is called with the final transcript: if the last
+    speculation was started on the same text (ignoring case and punctuation) its result is
+    used, often it is already done. Otherwise the running speculation is stopped and awaited,
+    and the classification runs now, like before. Paths that do not call `classify()` call
+    `cancel()`.
+
+    A request is only stopped between two chunks of the LLM stream: while the LLM has not sent
+    the first token yet (or stalls), the worker thread cannot be interrupted and the next
+    request waits for it.
+
+    The classification builds its own message list from the MODUS_SELECTION template, so the
+    history of the prompt manager is not touched by speculations that are thrown away. The LLM
+    client is blocking, so each call runs in a worker thread and does not stall the STT stream.
+    """
+
+    def __init__(self, llm: LmmInterface):
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.llm = llm
+        self.enabled = os.getenv('MODE_SPECULATION', 'true').lower() == 'true'
+        # do not speculate on a single word, it is rarely the whole command
+        self.min_words = int(os.getenv('MODE_SPECULATION_MIN_WORDS', '2'))
+        # new words that are worth another LLM request
+        self.min_new_words = int(os.getenv('MODE_SPECULATION_MIN_NEW_WORDS', '2'))
+        self._speculation: Optional[_Speculation] = None
+        # text to speculate on when the request in flight has finished
+        self._pending: Optional[str] = None
+
+    def speculate(self, text: str):
+        """Start classifying `text` in the background, call it from the event loop."""
+        if not self.enabled or len(text.split()) < self.min_words:
+            return
+        speculation = self._speculation
+        if speculation is not None and not speculation.cancelled.is_set():
+            if not self._changed_materially(speculation.text, text):
+                return
+            self.logger.debug(f"Text changed, restarting speculation: '{text}'")
+        if speculation is not None and not speculation.task.done():
+            # one request at a time: stop the outdated one, the newest text follows when it has finished
+            speculation.cancelled.set()
+            self._pending = text
+            return
+        self._start(text)
+
+    async def classify(self, text: str) -> str:
+        """Return the raw LLM answer for the mode of `text`, from the speculation if it matches."""
+        speculation, self._speculation = self._speculation, None
+        self._pending = None
+        if (speculation is not None and not speculation.cancelled.is_set()
+                and _normalize(speculation.text) == _normalize(text)):
+            waited = time.monotonic()
+            try:
+                response = await speculation.task
+                self.logger.info(f"Speculative mode classification hit: waited {time.monotonic() - waited:.3f}s, "
+                                 f"started {waited - speculation.started:.3f}s before the final transcript")
+                return response
+            except Exception as e:
+                self.logger.warning(f"Speculative mode classification failed, running it again: {e}")
+        elif speculation is not None:
+            self.logger.info(f"Speculative mode classification miss: '{speculation.text}' != '{text}'")
+            # let the request in flight end before the next one starts
+            speculation.cancelled.set()
+            await asyncio.gather(speculation.task, return_exceptions=True)
+        return await asyncio.to_thread(self._classify_blocking, text, threading.Event())
+
+    def cancel(self):
+        """Drop the speculation, e.g. when the transcript is not used for a mode selection."""
+        self._pending = None
+        if self._speculation is not None:
+            # the worker thread stops reading the LLM stream at the next chunk (not before the
+            # first token), the next speculation waits until it has ended
+            self._speculation.cancelled.set()
+
+    def _start(self, text: str):
+        cancelled = threading.Event()
+        task = asyncio.create_task(asyncio.to_thread(self._classify_blocking, text, cancelled))
+        task.add_done_callback(self._on_done)
+        self._speculation = _Speculation(text=text, task=task, cancelled=cancelled)
+
+    def _on_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.debug(f"Speculative mode classification failed: {task.exception()}")
+        if self._speculation is None or self._speculation.task is not task or self._pending is None:
+            return
+        text, self._pending = self._pending, None
+        self._start(text)
+
+    def _changed_materially(self, old: str, new: str) -> bool:
+        old_words, new_words = _normalize(old).split(), _normalize(new).split()
+        if new_words[:len(old_words)] != old_words:
+            # words of the speculation have been revised
+            return True
+        return len(new_words) - len(old_words) >= self.min_new_words
+
+    def build_history(self, text: str) -> List[Dict[str, str]]:
+        return [
+            {'role': 'system', 'content': GLOBAL_BASE_TEMPLATES[Mode.MODUS_SELECTION.name].system_prompt},
+            {'role': 'user', 'content': text},
+        ]
+
+    def _classify_blocking(self, text: str, cancelled: threading.Event) -> str:
+        async def collect() -> str:
+            response = ''
+            chat = self.llm.chat(self.build_history(text))
+            try:
+                async for chunk in chat:
+                    if cancelled.is_set():
+                        break
+                    response += chunk
+            finally:
+                await chat.aclose()
+            return response
+        return asyncio.run(collect())
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r'[^\w\s]', '', text.lower()).split())
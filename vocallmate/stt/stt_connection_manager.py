@@ -0,0 +1,171 @@
+import time
+import asyncio
+import logging
+import aiohttp
+from typing import Optional
+
+
+class SttConnection:
+    """
+    One WebSocket connection to the STT server.
+
+    A reader task owns ws.receive() for the whole lifetime of the connection and puts every
+    message into `messages`, so an idle standby connection notices when the server closes
+    it, and a consumer can wait for messages without ever cancelling a pending receive.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, ws: aiohttp.ClientWebSocketResponse, connect_time: float):
+        self.session = session
+        self.ws = ws
+        # seconds the TCP and WebSocket handshake took
+        self.connect_time = connect_time
+        self.opened_at = time.monotonic()
+        # True if the connection has been opened ahead of time
+        self.warm = False
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self._closed = asyncio.Event()
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            while True:
+                msg = await self.ws.receive()
+                self.messages.put_nowait(msg)
+                if msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+        finally:
+            self._closed.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set() or self.ws.closed
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    async def receive(self) -> aiohttp.WSMessage:
+        return await self.messages.get()
+
+    async def send_bytes(self, data: bytes):
+        await self.ws.send_bytes(data)
+
+    async def close(self):
+        await self.ws.close()
+        self._reader.cancel()
+        await asyncio.gather(self._reader, return_exceptions=True)
+        await self.session.close()
+
+
+class SttConnectionManager:
+    """
+    Hands out WebSocket connections to the STT server and keeps one warm standby connection,
+    so the handshake is not on the critical path when the user starts talking.
+
+    `prewarm()` starts a background task that opens the standby connection. If the server
+    drops the idle standby (faster-whisper-server closes connections that receive no audio),
+    the task opens a new one, at most `max_rearms` times per `prewarm()`: a server that drops
+    every idle connection would otherwise see a reconnect every few seconds as long as nobody
+    talks. Call `prewarm()` shortly before the connection is needed. `connect()` returns the standby if it
+    is ready, waits for a handshake already in flight, and only opens a new connection as
+    the last resort.
+    """
+
+    def __init__(self, ws_url: str, connect_timeout: float = 5.0, retry_delay: float = 1.0, max_rearms: int = 1):
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.ws_url = ws_url
+        self.connect_timeout = connect_timeout
+        # seconds to wait before the next attempt when the standby cannot be opened
+        self.retry_delay = retry_delay
+        # standby connections opened again after the server dropped one, per prewarm()
+        self.max_rearms = max_rearms
+        self._standby: Optional[SttConnection] = None
+        self._standby_ready: Optional[asyncio.Event] = None
+        self._standby_task: Optional[asyncio.Task] = None
+        # number of standby connections opened, and of those dropped unused by the server
+        self.standby_opened = 0
+        self.standby_dropped = 0
+
+    def prewarm(self):
+        """Start opening a standby connection in the background. Must be called from the event loop."""
+        if self._standby_task is not None and not self._standby_task.done():
+            return
+        self._standby_ready = asyncio.Event()
+        self._standby_task = asyncio.get_running_loop().create_task(self._keep_standby())
+
+    async def connect(self) -> SttConnection:
+        """Return the warm standby connection, or open a new one."""
+        task = self._standby_task
+        if task is not None and not task.done():
+            if not self._standby_ready.is_set():
+                # a handshake is in flight, finishing it is quicker than starting another one
+                try:
+                    await asyncio.wait_for(self._standby_ready.wait(), self.connect_timeout)
+                except asyncio.TimeoutError:
+                    pass
+            conn = self._standby
+            self._standby = None
+            task.cancel()
+            if conn is not None and not conn.closed:
+                self.logger.debug(f"Using warm connection, opened {time.monotonic() - conn.opened_at:.1f}s ago")
+                return conn
+            if conn is not None:
+                await conn.close()
+        return await self._open()
+
+    async def close(self):
+        """Stop keeping a standby connection and close it."""
+        if self._standby_task is not None:
+            self._standby_task.cancel()
+            await asyncio.gather(self._standby_task, return_exceptions=True)
+        if self._standby is not None:
+            await self._standby.close()
+            self._standby = None
+
+    async def _open(self) -> SttConnection:
+        start = time.monotonic()
+        session = aiohttp.ClientSession()
+        try:
+            ws = await asyncio.wait_for(session.ws_connect(self.ws_url), self.connect_timeout)
+        except BaseException:
+            await session.close()
+            raise
+        return SttConnection(session, ws, time.monotonic() - start)
+
+    async def _keep_standby(self):
+        conn = None
+        rearms = 0
+        try:
+            while True:
+                try:
+                    conn = await self._open()
+                except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+                    self.logger.warning(f"Cannot open standby connection to {self.ws_url}: {e}")
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                conn.warm = True
+                self.standby_opened += 1
+                self._standby = conn
+                self._standby_ready.set()
+                self.logger.debug(f"Standby connection ready after {conn.connect_time:.3f}s")
+                await conn.wait_closed()
+                # the server dropped the unused standby connection, open the next one
+                self._standby_ready.clear()
+                self._standby = None
+                self.standby_dropped += 1
+                lifetime = time.monotonic() - conn.opened_at
+                await conn.close()
+                conn = None
+                if rearms >= self.max_rearms:
+                    self.logger.debug(f"Standby connection dropped by the server after {lifetime:.1f}s, "
+                                      f"connect() opens a new one")
+                    return
+                rearms += 1
+                if lifetime < self.retry_delay:
+                    # do not hammer a server that drops idle connections right away
+                    await asyncio.sleep(self.retry_delay - lifetime)
+        finally:
+            # when cancelled by connect() the connection has been handed out already
+            if conn is not None and self._standby is conn:
+                self._standby = None
+                await conn.close()
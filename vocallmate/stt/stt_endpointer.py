@@ -0,0 +1,63 @@
+import logging
+from typing import AsyncGenerator, AsyncIterator, Optional
+from vocallmate.voice_activated_recording.vad_stage import VadStage, SPEECH_START
+
+
+class SpeechEndpointer:
+    """
+    Ends a recording stream as soon as the utterance is over, so the STT provider can finish
+    the transcript instead of decoding silence until the server gives up.
+
+    The audio is passed through unchanged while a VadStage classifies it frame by frame.
+    The stream ends
+      - `trailing_silence` seconds after the last speech frame,
+      - after `lead_time` seconds if no speech has been detected at all,
+      - after `max_duration` seconds in any case.
+    Silence never ends the stream within the first `lead_time` seconds, so the user has time
+    to start talking (and a pre-roll that still contains the wake word does not count as the
+    utterance being over).
+    """
+
+    def __init__(self, sample_rate: int = 16000, lead_time: float = 2.0, trailing_silence: float = 0.8,
+                 max_duration: float = 15.0, vad_mode: int = 2, frame_ms: int = 20, onset_frames: int = 3):
+        """
+        :param vad_mode: WebRTC VAD aggressiveness, 0 (least) to 3 (most aggressive)
+        :param frame_ms: VAD frame length, 10, 20 or 30 ms
+        :param onset_frames: consecutive speech frames needed to count as speech (ignores clicks)
+        """
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.sample_rate = sample_rate
+        self.lead_time = lead_time
+        self.trailing_silence = trailing_silence
+        self.max_duration = max_duration
+        # speech ends after `trailing_silence` seconds of unvoiced frames
+        self.vad = VadStage(sample_rate=sample_rate, frame_ms=frame_ms, vad_mode=vad_mode, onset_frames=onset_frames,
+                            hangover_frames=max(1, round(trailing_silence * 1000 / frame_ms)))
+        # why the last stream ended: 'silence', 'no_speech', 'max_duration' or None if the source ended
+        self.last_end_reason: Optional[str] = None
+
+    async def stream(self, audio_stream: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+        """Yield the chunks of `audio_stream` until the end of the utterance, then close it."""
+        self.vad.reset()
+        speech_seen = False
+        self.last_end_reason = None
+        try:
+            async for chunk in audio_stream:
+                speech_seen |= any(event.kind == SPEECH_START for event in self.vad.process(chunk))
+                elapsed = self.vad.position / self.sample_rate
+                end_reason = None
+                if elapsed >= self.max_duration:
+                    end_reason = 'max_duration'
+                elif elapsed >= self.lead_time:
+                    if not speech_seen:
+                        end_reason = 'no_speech'
+                    elif not self.vad.in_speech:
+                        end_reason = 'silence'
+                yield chunk
+                if end_reason is not None:
+                    self.last_end_reason = end_reason
+                    self.logger.info(f"End of utterance ({end_reason}) after {elapsed:.2f}s of audio")
+                    return
+        finally:
+            if hasattr(audio_stream, 'aclose'):
+                await audio_stream.aclose()
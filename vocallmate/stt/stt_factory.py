@@ -1,6 +1,11 @@
 import os
 
 def SttFactory():
+    """
+    Return a new STT provider of STT_PROVIDER. Every caller gets its own instance, so its
+    connections stay on the event loop of that caller; what is expensive to load (the Vosk
+    model) is shared through the model registry (stt_model_registry).
+    """
     provider_name=os.getenv('STT_PROVIDER', 'whisper')
     match provider_name:
         case 'whisper':
@@ -12,4 +17,4 @@ def SttFactory():
         case _:
             raise Exception(f"SttFactory: unknown provider name {provider_name}")
     print(f"SttFactory: start {provider_name} provider. {p.config_str()}")
-    return p
\ No newline at end of file
+    return p
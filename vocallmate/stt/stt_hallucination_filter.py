@@ -0,0 +1,119 @@
+import os
+import re
+import yaml
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Phrases Whisper hallucinates on silence or noise, learned from its subtitle training data,
+# see https://github.com/openai/whisper/discussions/1536
+DEFAULT_PHRASES: Dict[str, List[str]] = {
+    "de": [
+        "Untertitel Vielen Dank für's Zuschauen und bis zum nächsten Mal!",
+        "Vielen Dank für's Zuschauen",
+        "Vielen Dank für Ihre Aufmerksamkeit",
+        "Das war's. Bis zum nächsten Mal.",
+        "Untertitelung aufgrund der Amara.org-Community",
+        "Untertitel im Auftrag des ZDF für funk, 2017",
+        "Untertitel von Stephanie Geiges",
+        "Untertitel der Amara.org-Community",
+        "Mehr Infos auf www .sommers -radio .de",
+        "Ich danke Ihnen für Ihre Aufmerksamkeit.",
+        "Die Amara.org-Community:",
+        "Wir sehen uns im nächsten Video. Bis dann.",
+        "Untertitel der Amara .org -Community",
+        "der Amara .org -Community",
+        "und bis zum nächsten Mal!",
+        "Untertitel im Auftrag des ZDF, 2017",
+        "Untertitel im Auftrag des ZDF, 2020",
+        "Untertitel im Auftrag des ZDF, 2018",
+        "Untertitel im Auftrag des ZDF, 2021",
+        "Untertitelung im Auftrag des ZDF, 2021",
+        "Copyright WDR 2021",
+        "Copyright WDR 2020",
+        "Copyright WDR 2019",
+        "SWR 2021",
+        "SWR 2020",
+        "Bis zum nächsten Mal.",
+        "Untertitel",
+        "-Community",
+        "Vielen Dank.",
+        " Und tschau.",
+        "Das war's."
+    ],
+}
+
+
+class HallucinationFilter:
+    """
+    Removes known hallucinated phrases from a transcript with one precompiled regular expression.
+
+    The phrases are merged into a prefix tree and compiled as one nested alternation, e.g.
+    "Untertitel(?: der Amara\\.org\\-Community| im Auftrag des ZDF)?", so the regex engine
+    decides at each position with one character test which phrases can still match,
+    instead of trying every phrase. Optional suffixes are greedy, so the longest phrase wins
+    ("Untertitel der Amara.org-Community" is removed as a whole, not just "Untertitel").
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = sorted({p for p in phrases if p})
+        self._pattern = re.compile(self._trie_pattern(self.phrases)) if self.phrases else None
+
+    def clean(self, text: str) -> str:
+        if self._pattern is None:
+            return text
+        return self._pattern.sub('', text)
+
+    @staticmethod
+    def _trie_pattern(phrases: List[str]) -> str:
+        trie = {}
+        for phrase in phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            # marks the end of a phrase
+            node[''] = {}
+
+        def build(node: dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in node.items() if char != '']
+            if not branches:
+                return ''
+            pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            if '' in node:
+                # a phrase ends here, the longer ones are optional
+                pattern = '(?:' + pattern + ')?'
+            return pattern
+
+        return build(trie)
+
+
+def load_phrases(path: Optional[str]) -> Dict[str, List[str]]:
+    """
+    Read the phrases per language from a YAML file with a list of phrases for each language code:
+
+        de:
+          - "Vielen Dank für's Zuschauen"
+        en:
+          - "Thanks for watching!"
+
+    Without a file the built-in phrases are used.
+    """
+    if not path:
+        return DEFAULT_PHRASES
+    with open(path, 'r', encoding='utf-8') as f:
+        config_data = yaml.safe_load(f) or {}
+    return {language: [str(p) for p in phrases or []] for language, phrases in config_data.items()}
+
+
+@lru_cache(maxsize=None)
+def get_hallucination_filter(language: str, path: Optional[str] = None) -> HallucinationFilter:
+    """
+    Return the filter for a language, built once and shared. The phrases are read from `path`,
+    or from the YAML file in STT_HALLUCINATION_PHRASES, or the built-in phrases are used.
+    """
+    if path is None:
+        path = os.getenv('STT_HALLUCINATION_PHRASES')
+    phrases = load_phrases(path)
+    if language not in phrases:
+        logging.getLogger(__name__).warning(f"No hallucination phrases for language {language}")
+    return HallucinationFilter(phrases.get(language, []))
@@ -1,15 +1,117 @@
 import os
+import wave
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from typing import Generator, AsyncGenerator, Callable
+from typing import Generator, AsyncGenerator, Callable, Dict, Iterable, Optional
+from vocallmate.audio_device.audio_buffer import AudioBuffer
+from vocallmate.stt.stt_local_agreement import LocalAgreement, TranscriptUpdate
 
 
 class SpeechToTextInterface(ABC):
 
     def __init__(self):
         self.stt_endpoint = os.getenv('STT_ENDPOINT', 'http://127.0.0.1:8000/v1/audio/transcriptions')
+        # number of consecutive hypotheses that have to agree on a word before it is stable
+        self.agreement_n = int(os.getenv('STT_AGREEMENT_N', '2'))
+        # all providers take 16 kHz mono 16-bit PCM
+        self.sample_rate = 16000
+        # number of files transcribe_many runs at the same time
+        self.max_concurrent_sessions = int(os.getenv('STT_MAX_CONCURRENT_SESSIONS', '4'))
 
     @abstractmethod
+    async def transcribe_updates(self, audio_stream: AsyncGenerator[bytes, None], websocket_on_close: Callable[[], None], websocket_on_open: Callable[[], None]) -> AsyncGenerator[TranscriptUpdate, None]:
+        """
+        Transcribe the audio stream and yield a TranscriptUpdate (stable text and unstable tail)
+        for every new hypothesis. The last update has no unstable tail.
+        """
+        pass
+
     async def transcribe_stream(self, audio_stream: AsyncGenerator[bytes, None], websocket_on_close: Callable[[], None], websocket_on_open: Callable[[], None]) -> AsyncGenerator[str, None]:
+        """
+        Yield the words of the transcript as soon as they are stable. The yielded parts are
+        never revised, joined they give the full transcript.
+        """
+        updates = self.transcribe_updates(audio_stream, websocket_on_close, websocket_on_open)
+        try:
+            async for update in updates:
+                if update.new_stable:
+                    yield update.new_stable
+        finally:
+            await updates.aclose()
+
+    async def transcribe_file(self, path: str, chunk_frames: int = 1024) -> str:
+        """
+        Transcribe a WAV file as fast as the provider can take it (no real-time pacing) and
+        return the full transcript.
+        """
+        text = ''
+        updates = self.transcribe_updates(self.read_audio_file(path, chunk_frames), lambda: None, lambda: None)
+        try:
+            async for update in updates:
+                text = update.stable_text
+        finally:
+            await updates.aclose()
+        return text
+
+    async def transcribe_many(self, paths: Iterable[str], max_concurrent: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """
+        Transcribe many WAV files with at most `max_concurrent` sessions at a time (default
+        `max_concurrent_sessions`, an explicit value may be higher). Returns the transcript for each path in the given order,
+        None for files that failed, the error is logged and the other files go on.
+        """
+        logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        if max_concurrent is not None and max_concurrent < 1:
+            raise Exception(f"transcribe_many: max_concurrent must be at least 1, got {max_concurrent}")
+        limit = asyncio.Semaphore(max_concurrent or self.max_concurrent_sessions)
+
+        async def transcribe(path: str) -> Optional[str]:
+            async with limit:
+                try:
+                    return await self.transcribe_file(path)
+                except Exception as e:
+                    logger.error(f"transcribe_many: {path} failed: {e}")
+                    return None
+
+        paths = list(paths)
+        results = await asyncio.gather(*(transcribe(path) for path in paths))
+        return dict(zip(paths, results))
+
+    async def read_audio_file(self, path: str, chunk_frames: int = 1024) -> AsyncGenerator[bytes, None]:
+        """
+        Yield the audio of a WAV file as 16 kHz mono 16-bit PCM chunks. Files in that format are
+        read from disk chunk by chunk, other files are loaded and converted as a whole.
+        """
+        try:
+            with wave.open(path, 'rb') as wf:
+                if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) == (self.sample_rate, 1, 2):
+                    while data := wf.readframes(chunk_frames):
+                        yield data
+                        # let the other sessions run, reading from disk does not block for long
+                        await asyncio.sleep(0)
+                    return
+        except wave.Error:
+            # e.g. 32-bit float WAV, which the wave module cannot read
+            pass
+        with open(path, 'rb') as f:
+            audio = AudioBuffer.from_wav_bytes(f.read())
+        samples = audio.to_mono().resampled(self.sample_rate).as_int16()
+        for pos in range(0, len(samples), chunk_frames):
+            yield samples[pos:pos + chunk_frames].tobytes()
+            await asyncio.sleep(0)
+
+    def create_agreement(self) -> LocalAgreement:
+        return LocalAgreement(self.agreement_n)
+
+    def prewarm(self):
+        """
+        Called from the event loop before the user starts talking (e.g. while waiting for the
+        wake word). Providers can prepare the next transcribe_stream call here.
+        """
+        pass
+
+    def close(self):
+        """Release what the provider holds (models, connections), it can be used again afterwards."""
         pass
 
     def config_str(self):
@@ -0,0 +1,88 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass(frozen=True)
+class TranscriptUpdate:
+    """
+    One step of a streaming transcript.
+
+    `stable_text` only ever grows, downstream stages can act on it right away. `unstable_tail`
+    is the rest of the latest hypothesis, it may still be revised. `new_stable` is the part of
+    `stable_text` confirmed by this update; concatenating all of them gives `stable_text`.
+    """
+    stable_text: str
+    unstable_tail: str
+    new_stable: str = ''
+
+    @property
+    def text(self) -> str:
+        """The whole latest hypothesis, stable and unstable part."""
+        return f"{self.stable_text} {self.unstable_tail}".strip()
+
+
+class LocalAgreement:
+    """
+    Word level stable prefix of a growing transcript (local agreement policy).
+
+    Streaming recognizers send the full hypothesis for the audio so far, and keep revising the
+    last words as they hear more. A word becomes stable once `n` consecutive hypotheses agree
+    on it and on all words before it. Stable words are never taken back, later hypotheses that
+    disagree only change the unstable tail. Words are compared without case and punctuation,
+    because Whisper adds a comma or a period when it hears more of the sentence.
+    """
+
+    def __init__(self, n: int = 2):
+        if n < 1:
+            raise Exception(f"LocalAgreement: n must be at least 1, got {n}")
+        self.n = n
+        self._stable: List[str] = []
+        self._hypotheses: List[List[str]] = []
+
+    @property
+    def stable_text(self) -> str:
+        return " ".join(self._stable)
+
+    def update(self, hypothesis: str) -> TranscriptUpdate:
+        """Add the next full hypothesis, returns the stable text and the unstable tail."""
+        words = hypothesis.split()
+        self._hypotheses = (self._hypotheses + [words])[-self.n:]
+        if len(self._hypotheses) == self.n:
+            agreed = self._common_prefix_length(self._hypotheses)
+            return self._confirm(words, agreed)
+        return self._confirm(words, 0)
+
+    def commit(self, text: Optional[str] = None) -> TranscriptUpdate:
+        """
+        Confirm all words of `text` (default: the latest hypothesis), e.g. when the recognizer
+        sends a final result or the stream has ended. Later hypotheses continue after it.
+        """
+        words = text.split() if text is not None else (self._hypotheses[-1] if self._hypotheses else [])
+        update = self._confirm(words, len(words))
+        self._hypotheses = []
+        return update
+
+    def _confirm(self, words: List[str], agreed: int) -> TranscriptUpdate:
+        old_stable = self.stable_text
+        # only words after the stable prefix can be added, the prefix itself stays as it is
+        if agreed > len(self._stable):
+            self._stable += words[len(self._stable):agreed]
+        stable = self.stable_text
+        return TranscriptUpdate(stable_text=stable,
+                                unstable_tail=" ".join(words[len(self._stable):]),
+                                new_stable=stable[len(old_stable):])
+
+    @staticmethod
+    def _common_prefix_length(hypotheses: List[List[str]]) -> int:
+        length = 0
+        for words in zip(*hypotheses):
+            if len({_normalize(w) for w in words}) != 1:
+                break
+            length += 1
+        return length
+
+
+def _normalize(word: str) -> str:
+    # words made of punctuation only (e.g. "-") are compared as they are
+    return re.sub(r'[^\w]', '', word.lower()) or word
@@ -0,0 +1,64 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict
+import vosk
+
+logger = logging.getLogger(__name__)
+
+# Process wide registry of loaded Vosk models, keyed by the real path of the model folder
+_lock = threading.Lock()
+_models: Dict[str, "_Entry"] = {}
+
+
+class _Entry:
+    def __init__(self):
+        self.model = None
+        self.refs = 0
+        # serializes loading of this model, other models can load at the same time
+        self.lock = threading.Lock()
+
+
+def acquire_vosk_model(model_path: str) -> vosk.Model:
+    """
+    Return the shared vosk.Model of a model folder, it is loaded on the first call. Every call
+    takes a reference that has to be given back with release_vosk_model(). Loading takes seconds,
+    do not call it from the event loop.
+    """
+    key = os.path.realpath(model_path)
+    with _lock:
+        entry = _models.setdefault(key, _Entry())
+        entry.refs += 1
+    try:
+        with entry.lock:
+            if entry.model is None:
+                if not os.path.isdir(key):
+                    raise RuntimeError(f"Vosk model folder not found at: {model_path}")
+                start = time.monotonic()
+                entry.model = vosk.Model(key)
+                logger.info(f"Loaded Vosk model {key} in {time.monotonic() - start:.2f}s")
+            return entry.model
+    except BaseException:
+        release_vosk_model(model_path)
+        raise
+
+
+def release_vosk_model(model_path: str):
+    """Give back a reference, the model is freed when the last one is released."""
+    key = os.path.realpath(model_path)
+    with _lock:
+        entry = _models.get(key)
+        if entry is None or entry.refs == 0:
+            raise Exception(f"release_vosk_model: {model_path} has not been acquired")
+        entry.refs -= 1
+        if entry.refs == 0:
+            del _models[key]
+            if entry.model is not None:
+                logger.info(f"Released Vosk model {key}")
+
+
+def loaded_vosk_models() -> Dict[str, int]:
+    """The loaded models and their reference counts."""
+    with _lock:
+        return {key: entry.refs for key, entry in _models.items() if entry.model is not None}
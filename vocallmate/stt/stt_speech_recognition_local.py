@@ -4,7 +4,11 @@ import time
 import vosk
 import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from vocallmate.stt.stt_interface import SpeechToTextInterface
+from vocallmate.stt.stt_model_registry import acquire_vosk_model, release_vosk_model
 
 
 class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
@@ -12,26 +16,32 @@ class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
     A local STT class that mimics the streaming functionality of SpeechToTextWhisperRemote.
 
     Instead of sending audio to a remote WebSocket server, it uses the Vosk engine locally.
-    It supports partial recognition by yielding partial transcripts on each chunk.
+    It supports partial recognition by yielding transcript updates on each chunk.
     Automatically ends transcription if no speech is detected for 3 seconds.
+
+    Decoding is CPU bound, so it runs on a pool of VOSK_WORKERS decoder threads and not in
+    the event loop (Vosk releases the GIL while it decodes). Every session gets its own
+    recognizer from the shared model, so several streams can be transcribed at once.
     """
 
     def __init__(self):
         super().__init__()
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
-        # Prepare your Vosk model. Adjust path or use environment variable VOSK_MODEL_PATH if desired.
-        model_path = os.getenv("VOSK_MODEL_PATH", "./model")
-        if not os.path.isdir(model_path):
-            raise RuntimeError(f"Vosk model folder not found at: {model_path}")
-
-        self.model = vosk.Model(model_path)
-        # We create one KaldiRecognizer for the standard 16k single-channel audio
+        # Vosk model folder, the model is shared by all providers in the process (see stt_model_registry)
+        # and loaded on first use or by prewarm(). Adjust path or use environment variable VOSK_MODEL_PATH.
+        self.model_path = os.getenv("VOSK_MODEL_PATH", "./model")
+        if not os.path.isdir(self.model_path):
+            raise RuntimeError(f"Vosk model folder not found at: {self.model_path}")
+        self.model: Optional[vosk.Model] = None
+        self._model_lock = threading.Lock()
+        # Every session creates a KaldiRecognizer for the standard 16k single-channel audio
         # If you need more advanced usage (e.g., multi-channel), adjust here.
         self.sample_rate = 16000
-        self.recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+        self.workers = int(os.getenv('VOSK_WORKERS', str(min(4, os.cpu_count() or 1))))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="VoskDecoder")
         self.NO_SPEECH_TIMEOUT = 3.0  # seconds of silence before ending
 
-    async def transcribe_stream(
+    async def transcribe_updates(
             self,
             audio_stream: asyncio.coroutines,  # i.e., AsyncGenerator[bytes, None]
             websocket_on_close,
@@ -39,12 +49,14 @@ class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
     ):
         """
         Asynchronously consumes raw 16-bit PCM audio chunks from `audio_stream`,
-        processes them locally via the Vosk engine, and yields partial or final transcripts.
+        processes them locally via the Vosk engine, and yields a TranscriptUpdate
+        (stable text and unstable tail) whenever the transcript changes.
 
         This mimics the signature and behavior from SpeechToTextWhisperRemote:
          - `websocket_on_open()` is called right before we start reading audio.
          - `websocket_on_close()` is called after we finish or hit an error.
-         - Yields incremental text output (partial results).
+         - Vosk partial results are hypotheses for the current utterance segment, its
+           final results are stable as a whole.
          - Terminates if there's no recognized speech for self.NO_SPEECH_TIMEOUT seconds.
         """
 
@@ -52,11 +64,15 @@ class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
         websocket_on_open()
         self.logger.debug("Local streaming STT started.")
 
-        old_full_text = ""       # Accumulate final recognized text
-        old_partial_text = ""    # Track partial text for incremental updates
+        loop = asyncio.get_running_loop()
+        agreement = self.create_agreement()
+        segments_text = ""       # Text of the finished segments (final results)
+        old_partial_text = ""    # Track partial text to skip unchanged partials
         last_speech_time = time.time()  # When we last got *any* recognized text
 
         try:
+            # a fresh recognizer per session, it keeps the state of one utterance only
+            recognizer = vosk.KaldiRecognizer(await self._load_model(), self.sample_rate)
             while True:
                 # Pull the next chunk from the audio stream
                 try:
@@ -65,35 +81,28 @@ class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
                     # The audio stream ended
                     break
 
-                # Feed the chunk to Vosk's recognizer
-                is_final = self.recognizer.AcceptWaveform(chunk)
+                # Feed the chunk to Vosk's recognizer on a decoder thread
+                is_final, res = await loop.run_in_executor(self.executor, self._decode, recognizer, chunk)
 
                 if is_final:
-                    # Final result for this chunk
-                    res = json.loads(self.recognizer.Result())
+                    # Final result for this segment, Vosk starts a new segment after it
                     final_text = res.get("text", "")
+                    old_partial_text = ""
 
-                    # Determine the newly recognized text portion
-                    diff = final_text[len(old_full_text):]
-                    old_full_text = final_text
-
-                    if diff.strip():
-                        yield diff
+                    if final_text.strip():
+                        segments_text = f"{segments_text} {final_text}".strip()
+                        yield agreement.commit(segments_text)
                         # We heard actual speech -> reset silence timer
                         last_speech_time = time.time()
                     # else: it's an empty final => continue
 
                 else:
                     # We only got a partial (interim) result
-                    partial_res = json.loads(self.recognizer.PartialResult())
-                    partial_text = partial_res.get("partial", "")
+                    partial_text = res.get("partial", "")
 
-                    # Identify the newly recognized partial portion
-                    diff = partial_text[len(old_partial_text):]
-                    old_partial_text = partial_text
-
-                    if diff.strip():
-                        yield diff
+                    if partial_text.strip() and partial_text != old_partial_text:
+                        old_partial_text = partial_text
+                        yield agreement.update(f"{segments_text} {partial_text}")
                         # We heard actual speech -> reset silence timer
                         last_speech_time = time.time()
 
@@ -103,11 +112,9 @@ class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
                     break
 
             # Once the stream is fully consumed or we've timed out, get leftover final
-            final_res = json.loads(self.recognizer.FinalResult())
+            final_res = json.loads(await loop.run_in_executor(self.executor, recognizer.FinalResult))
             final_text = final_res.get("text", "")
-            diff = final_text[len(old_full_text):]
-            if diff.strip():
-                yield diff
+            yield agreement.commit(f"{segments_text} {final_text}")
 
         except BaseException as e:
             self.logger.error(f"exception: {type(e)} {e}")
@@ -115,3 +122,33 @@ class SpeechToTextSpeechRecognitionLocal(SpeechToTextInterface):
             self.logger.debug("closing local STT.")
             # For consistency, call the "websocket_on_close" callback
             websocket_on_close()
+
+    def prewarm(self):
+        """Load the model in the background while the wake word stage runs."""
+        self.executor.submit(self._acquire_model)
+
+    def close(self):
+        """Give back the model, it is freed when no other provider uses it."""
+        with self._model_lock:
+            if self.model is not None:
+                self.model = None
+                release_vosk_model(self.model_path)
+
+    def _acquire_model(self) -> vosk.Model:
+        with self._model_lock:
+            if self.model is None:
+                self.model = acquire_vosk_model(self.model_path)
+            return self.model
+
+    async def _load_model(self) -> vosk.Model:
+        if self.model is not None:
+            return self.model
+        # loading takes seconds, keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._acquire_model)
+
+    @staticmethod
+    def _decode(recognizer: vosk.KaldiRecognizer, chunk: bytes) -> Tuple[bool, dict]:
+        """Runs on a decoder thread: feed one chunk, return if it ended a segment and the result."""
+        if recognizer.AcceptWaveform(chunk):
+            return True, json.loads(recognizer.Result())
+        return False, json.loads(recognizer.PartialResult())
@@ -0,0 +1,89 @@
+import io
+import numpy as np
+import soundfile as sf
+from typing import List
+
+
+class UplinkCodec:
+    """
+    Encodes the microphone stream for the WebSocket uplink to the STT server, and decodes it
+    on the server side (uplink proxy or stand-in server).
+
+    The plain codec sends raw 16-bit PCM chunks as they come. The compressed codecs collect
+    `segment_ms` of audio and send each segment as a self-contained FLAC file,
+    so every WebSocket message can be decoded on its own. Longer segments compress better,
+    but the audio reaches the server up to one segment later.
+
+    The encoder restarts for every segment, so every message carries the container headers.
+    On stt-stack/audio.wav (PCM 256 kbps) FLAC needs 71 kbps with 200 ms segments.
+
+    There is no Opus codec: restarted for every segment, the encoder priming cuts the SNR
+    down to 15 dB against the input at 200 ms (58 kbps), 19 dB at 500 ms (37 kbps), which
+    hurts the recognition. A continuous encoder per session would avoid that, but libsndfile
+    only writes an Ogg page about every second and cannot decode a FLAC stream of unknown length.
+    """
+    name = 'pcm'
+
+    def __init__(self, sample_rate: int = 16000, segment_ms: int = 200):
+        self.sample_rate = sample_rate
+        self.segment_bytes = int(sample_rate * segment_ms / 1000) * 2
+        self._pending = bytearray()
+
+    def encode(self, pcm: bytes) -> List[bytes]:
+        """Add raw int16 PCM, returns the messages that are ready to be sent (maybe none)."""
+        return [pcm]
+
+    def flush(self) -> List[bytes]:
+        """Return the messages for the audio still buffered at the end of the stream."""
+        return []
+
+    def decode(self, message: bytes) -> bytes:
+        """Return the raw int16 PCM of one message."""
+        return message
+
+
+class SegmentCodec(UplinkCodec):
+    """Base for codecs that send self-contained sound files of `segment_ms` each."""
+    format = None
+    subtype = None
+
+    def encode(self, pcm: bytes) -> List[bytes]:
+        self._pending += pcm
+        messages = []
+        while len(self._pending) >= self.segment_bytes:
+            messages.append(self._encode_segment(self._pending[:self.segment_bytes]))
+            del self._pending[:self.segment_bytes]
+        return messages
+
+    def flush(self) -> List[bytes]:
+        # drop a trailing odd byte, it cannot be a complete sample
+        pending = self._pending[:len(self._pending) & ~1]
+        self._pending = bytearray()
+        return [self._encode_segment(pending)] if pending else []
+
+    def _encode_segment(self, pcm: bytearray) -> bytes:
+        buffer = io.BytesIO()
+        sf.write(buffer, np.frombuffer(pcm, dtype=np.int16), self.sample_rate,
+                 format=self.format, subtype=self.subtype)
+        return buffer.getvalue()
+
+    def decode(self, message: bytes) -> bytes:
+        samples, _ = sf.read(io.BytesIO(message), dtype='int16')
+        return samples.tobytes()
+
+
+class FlacCodec(SegmentCodec):
+    """Lossless, see UplinkCodec for the size per segment length."""
+    name = 'flac'
+    format = 'FLAC'
+    subtype = 'PCM_16'
+
+
+def create_uplink_codec(name: str, sample_rate: int = 16000, segment_ms: int = 200) -> UplinkCodec:
+    match name:
+        case 'pcm':
+            return UplinkCodec(sample_rate, segment_ms)
+        case 'flac':
+            return FlacCodec(sample_rate, segment_ms)
+        case _:
+            raise Exception(f"create_uplink_codec: unknown codec {name}")
@@ -0,0 +1,75 @@
+import os
+import asyncio
+import logging
+import argparse
+import aiohttp
+from aiohttp import web
+from vocallmate.stt.stt_uplink_codec import create_uplink_codec
+
+
+class SttUplinkProxy:
+    """
+    Runs next to faster-whisper-server and decodes compressed uplink audio for it.
+
+    Satellites connect with `?codec=flac`, the proxy decodes every message to raw PCM
+    and forwards it to the server on the local network, transcripts are relayed back
+    unchanged. All other query parameters are passed on to the server.
+    """
+
+    def __init__(self, upstream_url: str):
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.upstream_url = upstream_url
+        self.app = web.Application()
+        self.app.router.add_get('/v1/audio/transcriptions', self.handle_transcription)
+
+    async def handle_transcription(self, request: web.Request) -> web.WebSocketResponse:
+        try:
+            codec = create_uplink_codec(request.query.get('codec', 'pcm'))
+        except Exception as e:
+            raise web.HTTPBadRequest(text=str(e))
+        query = {k: v for k, v in request.query.items() if k != 'codec'}
+        async with aiohttp.ClientSession() as session:
+            try:
+                upstream = await session.ws_connect(self.upstream_url, params=query)
+            except (aiohttp.ClientError, OSError) as e:
+                self.logger.error(f"Cannot connect to {self.upstream_url}: {e}")
+                raise web.HTTPBadGateway(text=str(e))
+            ws = web.WebSocketResponse()
+            await ws.prepare(request)
+
+            async def uplink():
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.BINARY:
+                        await upstream.send_bytes(codec.decode(msg.data))
+                    elif msg.type == aiohttp.WSMsgType.TEXT:
+                        # not audio, the server decides what to do with it
+                        await upstream.send_str(msg.data)
+                    else:
+                        self.logger.warning(f"Dropping {msg.type.name} message from the client: {msg.data}")
+
+            async def downlink():
+                async for msg in upstream:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        await ws.send_str(msg.data)
+
+            tasks = [asyncio.create_task(uplink()), asyncio.create_task(downlink())]
+            try:
+                # the server closes the session when the audio has ended, the client may leave earlier
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await upstream.close()
+                await ws.close()
+        return ws
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Decodes compressed STT uplink audio for faster-whisper-server")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--upstream', default=os.getenv('STT_UPSTREAM', 'ws://127.0.0.1:8000/v1/audio/transcriptions'))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(SttUplinkProxy(args.upstream).app, host=args.host, port=args.port)
@@ -1,52 +1,25 @@
+import os
 import json
 import time
-from typing import Callable, AsyncGenerator
-import websocket
-import threading
 import asyncio
 import logging
-from queue import Queue
+import aiohttp
+from typing import Callable, AsyncGenerator, Optional
 
 from vocallmate.stt.stt_interface import SpeechToTextInterface
-from websocket import WebSocket, WebSocketApp, ABNF
-
-# see https://github.com/openai/whisper/discussions/1536
-dataset_bias = [
-    "Untertitel Vielen Dank für's Zuschauen und bis zum nächsten Mal!",
-    "Vielen Dank für's Zuschauen",
-    "Vielen Dank für Ihre Aufmerksamkeit",
-    "Das war's. Bis zum nächsten Mal.",
-    "Untertitelung aufgrund der Amara.org-Community",
-    "Untertitel im Auftrag des ZDF für funk, 2017",
-    "Untertitel von Stephanie Geiges",
-    "Untertitel der Amara.org-Community",
-    "Mehr Infos auf www .sommers -radio .de",
-    "Ich danke Ihnen für Ihre Aufmerksamkeit.",
-    "Die Amara.org-Community:",
-    "Wir sehen uns im nächsten Video. Bis dann.",
-    "Untertitel der Amara .org -Community",
-    "der Amara .org -Community",
-    "und bis zum nächsten Mal!",
-    "Untertitel im Auftrag des ZDF, 2017",
-    "Untertitel im Auftrag des ZDF, 2020",
-    "Untertitel im Auftrag des ZDF, 2018",
-    "Untertitel im Auftrag des ZDF, 2021",
-    "Untertitelung im Auftrag des ZDF, 2021",
-    "Copyright WDR 2021",
-    "Copyright WDR 2020",
-    "Copyright WDR 2019",
-    "SWR 2021",
-    "SWR 2020",
-    "Bis zum nächsten Mal.",
-    "Untertitel",
-    "-Community",
-    "Vielen Dank.",
-    " Und tschau.",
-    "Das war's."
-]
+from vocallmate.stt.stt_local_agreement import TranscriptUpdate
+from vocallmate.stt.stt_connection_manager import SttConnection, SttConnectionManager
+from vocallmate.stt.stt_uplink_codec import create_uplink_codec
+from vocallmate.stt.stt_hallucination_filter import get_hallucination_filter
 
 
 class SpeechToTextWhisperRemote(SpeechToTextInterface):
+    """
+    Streams the microphone audio over a WebSocket to a faster-whisper-server and yields the
+    transcript as it grows (see transcribe_updates). The WebSocket runs on aiohttp in the event loop of the caller:
+    one task sends the audio chunks, the generator itself receives the transcripts.
+    Connections come from a SttConnectionManager, which can open them ahead of time (prewarm).
+    """
 
     def __init__(self):
         super().__init__()
@@ -54,116 +27,140 @@ class SpeechToTextWhisperRemote(SpeechToTextInterface):
         self.url= self.stt_endpoint
         # use the http endpoint for websocket
         self.ws_url = self.stt_endpoint.replace('http://','ws://')
-        websocket.enableTrace(False)
+        # compression of the audio uplink (pcm, flac). Compressed audio has to be sent to
+        # the uplink proxy in front of the server, which decodes it (see stt_uplink_proxy.py).
+        self.uplink_codec = os.getenv('STT_UPLINK_CODEC', 'pcm')
+        self.uplink_segment_ms = int(os.getenv('STT_UPLINK_SEGMENT_MS', '200'))
+        if self.uplink_codec != 'pcm':
+            self.ws_url += f"{'&' if '?' in self.ws_url else '?'}codec={self.uplink_codec}"
+        # seconds to wait for the last transcripts after the audio stream has ended
+        self.final_timeout = float(os.getenv('STT_FINAL_TIMEOUT', '2.0'))
+        # keep a warm standby connection when prewarm() is called
+        self.prewarm_enabled = os.getenv('STT_PREWARM', 'true').lower() == 'true'
+        self.connections = SttConnectionManager(self.ws_url)
+        # removes phrases Whisper hallucinates on silence (per language, see STT_HALLUCINATION_PHRASES)
+        self.language = os.getenv('STT_LANGUAGE', 'de')
+        self.hallucination_filter = get_hallucination_filter(self.language)
         # if True then the transcription send to the API server is stored as recording_TIMESTAMP.wav
         self.store_wav = False
 
-
-    async def transcribe_stream(self, audio_stream: AsyncGenerator[bytes, None], websocket_on_close: Callable[[], None], websocket_on_open: Callable[[], None]) -> AsyncGenerator[str, None]:
-        queue = Queue()  # Back channel for transcription results
-        # A callback function for receiving messages from the WebSocket
-        def on_message(wsc: WebSocket, message: str):
-            try:
-                result = json.loads(message)
-                if 'text' in result and result['text'].strip():
-                    res_txt = result['text'].strip().replace('  ',' ')
-                    # remove unwanted response, see
-                    # https://github.com/openai/whisper/discussions/1536
-                    for txt in dataset_bias:
-                        if txt in res_txt:
-                            res_txt = res_txt.replace(txt, '')
-                    if len(res_txt.strip()) > 8:
-                        queue.put(res_txt.strip())  # Push the transcription result into the queue
-            except json.JSONDecodeError:
-                self.logger.warning(f"got non json: {message}")
-                pass  # Ignore non-JSON messages
-        # A synchronous callback for handling WebSocket connection establishment
-        thread_stop_event =  threading.Event()
-        # Collect the WAV data from the stream into a BytesIO buffer
-        def on_open(wsc2: WebSocket):
-            self.logger.debug(f"Successfully connected websocket {self.ws_url}")
-            # call external callback
-            websocket_on_open()
-            def send_audio_chunks():
-                try:
-                    start_time_sending = time.time()
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    async def send_chunks():
-                            async for wav_chunk in audio_stream:
-                                if thread_stop_event.is_set():  # Check if the stop event is set
-                                    #self.logger.info("stt_whisper_remote.transcribe_stream.on_open.send_audio_chunks.send_chunks: Stop signal received, exiting send_chunks.")
-                                    loop.stop()
-                                    break
-                                # Websocket needs raw PCM (pcm_s16le) encoded bytes.
-                                # Only transcription of a single channel, 16000 sample rate, raw, 16-bit little-endian
-                                # audio is supported.
-                                wsc2.send(wav_chunk, opcode=ABNF.OPCODE_BINARY)
-                    loop.run_until_complete(send_chunks())
-                except KeyboardInterrupt as e:
-                    # stopped by the user
-                    websocket_on_close()
-                    thread_stop_event.set()
-                    raise e
-                except BaseException as e:
-                    self.logger.error(f"Error in send_audio_chunks: {e}")
-                    websocket_on_close()
-                    thread_stop_event.set()
-                finally:
-                    self.logger.debug(f"Sent data to websocket for {time.time()-start_time_sending} seconds. Cleaning up thread and ws resources.")
-                    if wsc2:
-                        wsc2.close()  # Close the WebSocket connection
-                    if loop:
-                        if loop.is_running():
-                            loop.stop()
-                        if not loop.is_closed():
-                            loop.close()
-                    thread_stop_event.set()
-            # Start the thread to run async
-            threading.Thread(target=send_audio_chunks, daemon=True).start()
-        def on_error(ws, code):
-            self.logger.error(f"WebSocket error: {code}")
+    async def transcribe_updates(self, audio_stream: AsyncGenerator[bytes, None], websocket_on_close: Callable[[], None], websocket_on_open: Callable[[], None]) -> AsyncGenerator[TranscriptUpdate, None]:
+        """
+        Send the audio stream to the server and yield the stable and unstable part of the
+        transcript for every update. The server sends the full transcript each time and Whisper
+        keeps revising the last words, so words only become stable when consecutive transcripts
+        agree on them. Ends when the server closes the connection, or `final_timeout` seconds
+        after the audio stream has ended; the last transcript is then stable as a whole.
+        Closing the generator cancels the sender and closes the connection.
+        """
+        self.logger.debug(f"Starting websocket connection to {self.ws_url}")
+        start_time = time.monotonic()
+        try:
+            conn = await self.connections.connect()
+        except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+            self.logger.error(f"WebSocket error: {e}")
             websocket_on_close()
-            thread_stop_event.set()
-        def on_close(ws: WebSocket, i1, i2):
-            self.logger.debug(f"WebSocket closed: {i1}, {i2}")
-            queue.put(None)
+            return
+        self.logger.debug(f"Successfully connected websocket {self.ws_url} "
+                          f"({'warm' if conn.warm else 'cold'}, {time.monotonic() - start_time:.3f}s)")
+        websocket_on_open()
+        send_task = asyncio.create_task(self._send_audio_chunks(conn, audio_stream))
+        agreement = self.create_agreement()
+        try:
+            first = True
+            async for t in self._receive_transcripts(conn, send_task):
+                if first:
+                    self.logger.debug(f"First transcript after {time.monotonic() - start_time:.3f}s")
+                    first = False
+                update = agreement.update(t)
+                self.logger.info(f"got: {update.stable_text} [{update.unstable_tail}]")
+                yield update
+            self.logger.debug("Transcription stream closed")
+            yield agreement.commit()
+        finally:
+            send_task.cancel()
+            await asyncio.gather(send_task, return_exceptions=True)
+            await conn.close()
             websocket_on_close()
-            thread_stop_event.set()
+            self.logger.debug("Cleanup completed")
+
+    def prewarm(self):
+        """Open the connection for the next transcribe_stream call in the background."""
+        if self.prewarm_enabled:
+            self.connections.prewarm()
+
+    async def _send_audio_chunks(self, conn: SttConnection, audio_stream: AsyncGenerator[bytes, None]):
+        start_time_sending = time.time()
+        # Websocket needs raw PCM (pcm_s16le) encoded bytes, or the same audio compressed with the uplink codec.
+        # Only transcription of a single channel, 16000 sample rate, raw, 16-bit little-endian
+        # audio is supported.
+        codec = create_uplink_codec(self.uplink_codec, segment_ms=self.uplink_segment_ms)
+        pcm_bytes = 0
+        sent_bytes = 0
         try:
-            self.logger.debug(f"Starting websocket connection to {self.ws_url}")
-            ws = WebSocketApp(
-                self.ws_url,
-                on_open=on_open,
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close
-            )
-            ws_thread = threading.Thread(target=ws.run_forever, daemon=True)
-            ws_thread.start()
-            # Wait for WebSocket to complete
-            # Yield transcription results from the queue
-            old_full_text = ''
-            while not thread_stop_event.is_set():
-                t = queue.get()
-                if t is None:
+            async for wav_chunk in audio_stream:
+                if conn.closed:
                     break
-                t_diff = t[len(old_full_text):]
-                # update the text
-                old_full_text = t
-                self.logger.info(f"got: {t_diff}")
-                yield t_diff
-            ws_thread.join()
-            self.logger.debug(f"Transcription queue closed")
-        except KeyboardInterrupt as e:
-            # stopped by the user
-            raise e
-        except BaseException as e:
-            self.logger.error(f"type={type(e)}, e={e}")
-            thread_stop_event.set()
-            if ws:
-                ws.close()  # Gracefully close the WebSocket
-            if ws_thread and ws_thread.is_alive():
-                ws_thread.join(timeout=5)  # Ensure the thread has stopped
+                pcm_bytes += len(wav_chunk)
+                for message in codec.encode(wav_chunk):
+                    await conn.send_bytes(message)
+                    sent_bytes += len(message)
+            else:
+                # the audio stream has ended, send what the codec still buffers
+                for message in codec.flush():
+                    await conn.send_bytes(message)
+                    sent_bytes += len(message)
+        except (aiohttp.ClientError, ConnectionResetError) as e:
+            self.logger.error(f"Error in send_audio_chunks: {e}")
+        finally:
+            self.logger.debug(f"Sent data to websocket for {time.time()-start_time_sending} seconds: "
+                              f"{pcm_bytes} bytes audio as {sent_bytes} bytes {codec.name}")
+
+    async def _receive_transcripts(self, conn: SttConnection, send_task: asyncio.Task) -> AsyncGenerator[str, None]:
+        """Yield the full transcripts received from the server until it closes the connection."""
+        receive_task: Optional[asyncio.Task] = None
+        try:
+            while True:
+                if receive_task is None:
+                    receive_task = asyncio.ensure_future(conn.receive())
+                if not send_task.done():
+                    # wake up when a message arrives or when the audio stream ends
+                    await asyncio.wait({receive_task, send_task}, return_when=asyncio.FIRST_COMPLETED)
+                    if not receive_task.done():
+                        continue
+                else:
+                    done, _ = await asyncio.wait({receive_task}, timeout=self.final_timeout)
+                    if not done:
+                        self.logger.debug(f"No transcript within {self.final_timeout}s after the end of the audio")
+                        return
+                msg = receive_task.result()
+                receive_task = None
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    text = self._parse_message(msg.data)
+                    if text is not None:
+                        yield text
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    self.logger.error(f"WebSocket error: {conn.ws.exception()}")
+                    return
+                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED):
+                    self.logger.debug(f"WebSocket closed: {conn.ws.close_code}")
+                    return
         finally:
-            self.logger.debug(f"Cleanup completed")
\ No newline at end of file
+            if receive_task is not None:
+                receive_task.cancel()
+
+    def _parse_message(self, message: str) -> Optional[str]:
+        """Return the cleaned transcript of a server message, or None if there is nothing to report."""
+        try:
+            result = json.loads(message)
+        except json.JSONDecodeError:
+            self.logger.warning(f"got non json: {message}")
+            return None
+        if 'text' in result and result['text'].strip():
+            res_txt = result['text'].strip().replace('  ',' ')
+            # remove unwanted response, see
+            # https://github.com/openai/whisper/discussions/1536
+            res_txt = self.hallucination_filter.clean(res_txt)
+            if len(res_txt.strip()) > 8:
+                return res_txt.strip()
+        return None
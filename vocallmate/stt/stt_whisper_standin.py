@@ -0,0 +1,91 @@
+import json
+import asyncio
+import logging
+import argparse
+from aiohttp import web
+from vocallmate.stt.stt_uplink_codec import create_uplink_codec
+
+DEFAULT_TRANSCRIPT = "Hallo Computer wie wird das Wetter morgen in Berlin und wann geht die Sonne auf"
+
+
+class WhisperStandinServer:
+    """
+    Stand-in for the faster-whisper-server WebSocket endpoint, for benchmarks without a GPU box.
+
+    It speaks the same protocol: the client sends raw 16 kHz mono int16 PCM, the server answers
+    with JSON messages {"text": <full transcript so far>}. Instead of running a model it reveals
+    `words_per_second` words of a fixed transcript for every second of audio received, one
+    message every `partial_interval` seconds of audio. Like the real server it closes the
+    connection when no audio arrives for `max_no_data_seconds`. `accept_delay` delays the
+    WebSocket handshake to emulate network round trips and session setup on the server.
+    Compressed uplink audio (`?codec=flac`) is decoded like the uplink proxy does.
+    """
+
+    def __init__(self, transcript: str = DEFAULT_TRANSCRIPT, accept_delay: float = 0.0,
+                 partial_interval: float = 0.5, words_per_second: float = 2.5,
+                 max_no_data_seconds: float = 5.0, sample_rate: int = 16000):
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        self.words = transcript.split()
+        self.accept_delay = accept_delay
+        self.partial_interval = partial_interval
+        self.words_per_second = words_per_second
+        self.max_no_data_seconds = max_no_data_seconds
+        self.sample_rate = sample_rate
+        self.sessions = 0
+        self.app = web.Application()
+        self.app.router.add_get('/v1/audio/transcriptions', self.handle_transcription)
+        self._runner = None
+
+    async def handle_transcription(self, request: web.Request) -> web.WebSocketResponse:
+        if self.accept_delay > 0:
+            await asyncio.sleep(self.accept_delay)
+        codec = create_uplink_codec(request.query.get('codec', 'pcm'), self.sample_rate)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sessions += 1
+        bytes_per_second = self.sample_rate * 2
+        received = 0
+        next_partial = self.partial_interval * bytes_per_second
+        try:
+            while True:
+                try:
+                    msg = await ws.receive(timeout=self.max_no_data_seconds)
+                except asyncio.TimeoutError:
+                    self.logger.debug(f"No audio for {self.max_no_data_seconds}s, closing the session")
+                    break
+                if msg.type != web.WSMsgType.BINARY:
+                    break
+                received += len(codec.decode(msg.data))
+                while received >= next_partial:
+                    seconds = next_partial / bytes_per_second
+                    text = " ".join(self.words[:int(seconds * self.words_per_second)])
+                    if text:
+                        await ws.send_str(json.dumps({"text": text}))
+                    next_partial += self.partial_interval * bytes_per_second
+        finally:
+            await ws.close()
+        return ws
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8000) -> str:
+        """Start serving in the running event loop, returns the http endpoint URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/v1/audio/transcriptions"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stand-in for the faster-whisper-server WebSocket endpoint")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--accept-delay', type=float, default=0.0, help="seconds to delay each WebSocket handshake")
+    args = parser.parse_args()
+    server = WhisperStandinServer(accept_delay=args.accept_delay)
+    web.run_app(server.app, host=args.host, port=args.port)
@@ -66,24 +66,28 @@ class TextToSpeechInterface(ABC):
                 self.clear_queue()
                 break
 
-            try:
-                sentence = self._sentence_queue.get(timeout=0.1)
-            except queue.Empty:
-                continue
-
-            if self.stop_signal.is_set():
-                self.clear_queue()
-                break
-
-            # Indicate we are now speaking
+            # Take the sentence and indicate we are now speaking in one step: wait_until_done
+            # must not see an empty queue while the sentence is not spoken yet
             with self._condition:
+                try:
+                    sentence = self._sentence_queue.get_nowait()
+                except queue.Empty:
+                    # speak() notifies when a sentence is queued
+                    self._condition.wait(timeout=0.1)
+                    continue
                 self._speaking = True
-            logging.debug(f"SPEAK SENTENCE: {sentence}. Remaining in queue {self._sentence_queue._qsize()}")
-            self.speak_sentence(sentence)
-            # Finished speaking
-            with self._condition:
-                self._speaking = False
-                self._condition.notify_all()
+
+            try:
+                if self.stop_signal.is_set():
+                    self.clear_queue()
+                    break
+                logging.debug(f"SPEAK SENTENCE: {sentence}. Remaining in queue {self._sentence_queue._qsize()}")
+                self.speak_sentence(sentence)
+            finally:
+                # Finished speaking
+                with self._condition:
+                    self._speaking = False
+                    self._condition.notify_all()
 
     def clear_queue(self):
         with self._sentence_queue.mutex:
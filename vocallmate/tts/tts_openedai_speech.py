@@ -2,7 +2,7 @@ import openai
 import logging
 from vocallmate.tts.tts_interface import TextToSpeechInterface
 from io import BytesIO
-import soundfile as sf
+from vocallmate.audio_device.audio_buffer import AudioBuffer
 
 class TextToSpeechOpenedaiSpeech(TextToSpeechInterface):
     """
@@ -30,11 +30,9 @@ class TextToSpeechOpenedaiSpeech(TextToSpeechInterface):
             speed="1.0",
             input=sentence,
         )
-        audio_stream = BytesIO(response.content)  # Use response.content to access binary audio data
-        audio_stream.seek(0)  # Reset the buffer pointer to the start
-        # Decode MP3 to WAV in-memory
-        data, sample_rate = sf.read(audio_stream, dtype='float32')
-        self.soundcard.play_audio(sample_rate, data)
+        # Wrap the int16 samples of the WAV response in place, the soundcard converts them at most once
+        audio = AudioBuffer.from_wav_bytes(response.content)
+        self.soundcard.play_audio(audio.sample_rate, audio)
 
     def render_sentence(self, sentence: str, store_file_name: str, output_format: str = 'mp3'):
         if output_format not in ["mp3", "wav"]:
@@ -2,6 +2,7 @@ from vocallmate.human_speech_agent import HumanSpeechAgent
 from vocallmate.stt.stt_factory import SttFactory
 from vocallmate.tts.tts_factory import TtsFactory
 from vocallmate.llm.llm_factory import LlmFactory
+from vocallmate.llm.llm_mode_classifier import ModeClassifier
 from vocallmate.voice_activated_recording.va_factory import VoiceActivatedRecordingFactory
 
 class VocaLLMateFactory:
@@ -10,6 +11,7 @@ class VocaLLMateFactory:
         self.stt_provider = SttFactory()
         self.tts_provider = TtsFactory()
         self.llm_provider = LlmFactory()
+        self.mode_classifier = ModeClassifier(self.llm_provider)
         self.va_provider = VoiceActivatedRecordingFactory()
         self.human_speech_agent = HumanSpeechAgent()
 
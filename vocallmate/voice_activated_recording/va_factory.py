@@ -1,11 +1,14 @@
 import os
 
 def VoiceActivatedRecordingFactory():
-    provider_name=os.getenv('WAKEWORD_PROVIDER', 'speech-recognition')
+    provider_name=os.getenv('WAKEWORD_PROVIDER', 'stt-provider-va')
     match provider_name:
         case 'stt-provider-va':
             from vocallmate.voice_activated_recording.va_stt_provider import SttProviderWakeWord
             p = SttProviderWakeWord()
+        case 'vosk-kws':
+            from vocallmate.voice_activated_recording.va_vosk_kws import VoskKeywordWakeWord
+            p = VoskKeywordWakeWord()
         case 'picovoice':
             from vocallmate.voice_activated_recording.va_picovoice import PorcupineWakeWord
             p = PorcupineWakeWord()
@@ -1,7 +1,8 @@
 import os
+import asyncio
 import threading
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Awaitable, Optional
 
 from vocallmate.audio_device.soundcard_factory import SoundcardFactory
 
@@ -15,13 +16,41 @@ class VoiceActivationInterface(ABC):
         # Configurable delay before counting silence
         self.silence_lead_time = 2
         self.soundcard = SoundcardFactory()
+        # capture position at which the wake word has been detected, the speech recording starts there
+        # (minus the pre-roll and the detection lag)
+        self.detection_position: Optional[int] = None
+        # milliseconds from the end of the wake word until the provider detects it
+        self.detection_lag_ms = 0
 
     @abstractmethod
-    async def listen_for_wake_word(self, stop_signal: Optional[threading.Event] = None):
+    async def listen_for_wake_word(self, stop_signal: Optional[threading.Event] = None) -> bool:
         """
-        This function should block until the wakeword has been detected
+        This function should block until the wakeword has been detected, then set `stop_signal`
+        and return True. If `stop_signal` is set by someone else it returns False soon.
         """
         pass
 
+    def close(self):
+        """Release what the provider holds (models, threads), it can be used again afterwards."""
+        pass
+
+    @staticmethod
+    async def _until_stopped(listen: Awaitable[bool], stop_signal: Optional[threading.Event]) -> bool:
+        """Await `listen`, cancel it and return False as soon as `stop_signal` is set."""
+        task = asyncio.ensure_future(listen)
+        if stop_signal is None:
+            return await task
+        while not task.done():
+            if stop_signal.is_set():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return False
+            await asyncio.wait({task}, timeout=0.05)
+        return task.result()
+
+    def _mark_detection(self):
+        """Remember the capture position of the detection, call it when the wake word has been detected."""
+        self.detection_position = self.soundcard.capture_position()
+
     def config_str(self):
         return f'wakeword: {self.wakeword}, threshold: {self.wakeword_threshold}'
@@ -2,10 +2,10 @@ import sys
 import os
 import logging
 import pvporcupine
-import numpy as np
 import threading
 from typing import Optional
 from vocallmate.voice_activated_recording.va_interface import VoiceActivationInterface
+from vocallmate.audio_device.frame_assembler import FrameAssembler
 
 class PorcupineWakeWord(VoiceActivationInterface):
     def __init__(self):
@@ -25,23 +25,22 @@ class PorcupineWakeWord(VoiceActivationInterface):
             access_key=os.getenv('PICOVOICE_ACCESS_KEY')
         )
 
-    async def listen_for_wake_word(self, stop_signal: Optional[threading.Event] = None):
+    async def listen_for_wake_word(self, stop_signal: Optional[threading.Event] = None) -> bool:
         try:
             self.logger.info(f"Listening for wake word: {self.wakeword}")
-            buffer = []
+            frames = FrameAssembler(self.porcupine.frame_length)
             async for chunk in self.soundcard.get_record_stream():
-                # Convert raw PCM data to the format expected by Porcupine
-                pcm = np.frombuffer(chunk, dtype=np.int16)
-                buffer.extend(pcm)
-                # Process in frames of the expected length
-                while len(buffer) >= self.porcupine.frame_length:
-                    frame = np.array(buffer[:self.porcupine.frame_length], dtype=np.int16)
-                    buffer = buffer[self.porcupine.frame_length:]  # Remove processed samples
+                if stop_signal is not None and stop_signal.is_set():
+                    return False
+                # Process in frames of the expected length, views of the raw PCM data
+                for frame in frames.push(chunk):
                     result = self.porcupine.process(frame)
                     if result >= 0:
+                        self._mark_detection()
                         self.logger.info(f"Wake word '{self.wakeword}' detected!")
                         if stop_signal is not None:
                             stop_signal.set()
-                        return
+                        return True
+            return False
         finally:
             pass
\ No newline at end of file
@@ -1,44 +1,120 @@
+import os
+import time
 import logging
 import asyncio
-import webrtcvad
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, List, Optional
 from vocallmate.voice_activated_recording.va_interface import VoiceActivationInterface
+from vocallmate.voice_activated_recording.vad_stage import VadStage, SPEECH_START
 from vocallmate.stt.stt_whisper_remote import SpeechToTextWhisperRemote
 
 
+@dataclass
+class _RollingSession:
+    """An STT session of the rolling mode, the audio is handed over through the queue."""
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    task: Optional[asyncio.Task] = None
+    samples: int = 0
+    last_audio: float = field(default_factory=time.monotonic)
+    ended: Optional[float] = None
+
+    def send(self, chunk: bytes):
+        self.queue.put_nowait(chunk)
+        self.samples += len(chunk) // 2
+        self.last_audio = time.monotonic()
+
+    def finish(self):
+        self.queue.put_nowait(None)
+
+
 class SttProviderWakeWord(VoiceActivationInterface):
     """
-    A wakeword detection class that uses:
-      1) WebRTC VAD to wait for any speech.
+    A wakeword detection class that uses the remote Whisper STT in one of two modes
+    (WAKEWORD_STT_MODE):
+
+    session (default)
+      1) A VadStage (energy gate and WebRTC VAD) waits for the start of speech.
       2) Once speech is detected, uses the SpeechToTextWhisperRemote streaming
          to capture and transcribe until the remote service closes or
          we find the wakeword in the transcript. If the wakeword is found,
          we return immediately.
       3) If the STT ends without detecting the wakeword, we go back to VAD listening.
+      The audio between the start of speech and the new STT session is lost, and every
+      burst of speech opens a new WebSocket session.
+
+    rolling
+      One record stream runs all the time, only the chunks the VAD marks as speech (with
+      the chunks just before the start of speech) are sent to a long-lived STT session and
+      every partial transcript is matched. Whisper transcribes the whole session audio for
+      every partial, so the session is rotated after WAKEWORD_STT_WINDOW seconds of speech:
+      the next session starts with the last `overlap` seconds, so a wake word on the border
+      is not cut in two. A session also ends after `session_idle` seconds without speech.
+
+    On detection the latency since the start of speech and the STT sessions per hour of
+    listening are logged.
     """
 
     def __init__(self):
         super().__init__()
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
-        # Remote whisper-based STT object
+        # Remote whisper-based STT object, our own: it keeps its own warm standby connection,
+        # the wake word sessions must not take the one of the command
         self.stt = SpeechToTextWhisperRemote()
+        self.mode = os.getenv('WAKEWORD_STT_MODE', 'session')
+        if self.mode not in ('session', 'rolling'):
+            raise Exception(f"SttProviderWakeWord: unknown WAKEWORD_STT_MODE {self.mode}")
+
+        # A very aggressive VAD mode (3). Adjust if too sensitive / not sensitive enough.
+        # Speech needs a few consecutive voiced 20ms frames, so a click does not open an STT session.
+        # The rolling mode keeps sending 1s after the speech, the server needs audio to finish the last words.
+        self.vad = VadStage(sample_rate=self.soundcard.sample_rate, frame_ms=20, vad_mode=3, onset_frames=3,
+                            hangover_frames=50)
 
-        # Initialize a very aggressive VAD mode (3). Adjust if too sensitive / not sensitive enough.
-        self.vad = webrtcvad.Vad(mode=3)
+        # rolling mode: seconds of speech per STT session, seconds the next session starts with,
+        # seconds before the start of speech that are sent along
+        window = float(os.getenv('WAKEWORD_STT_WINDOW', '8'))
+        self.window_samples = int(window * self.soundcard.sample_rate)
+        self.overlap_samples = int(2.0 * self.soundcard.sample_rate)
+        self.lead_samples = int(0.3 * self.soundcard.sample_rate)
+        # end the session before the server does, it closes sessions without audio after 5 s
+        self.session_idle = 4.0
+        # seconds to wait before a new session when the last one has failed
+        self.retry_delay = 1.0
 
-        # Typically, your soundcard should produce 16-bit, 1-channel, 16kHz audio
-        # to match the VAD's default expectations.
-        # We'll chunk up frames into 20ms slices for VAD checks:
-        self.vad_frame_ms = 20
+        # the Whisper partial with the wake word arrives 0.7 - 1.2 s after the start of speech,
+        # the command can start right after the wake word
+        self.detection_lag_ms = 1000
 
-    async def listen_for_wake_word(self):
+        # statistics for the detection log
+        self.sessions = 0
+        self.listening_seconds = 0.0
+        self._speech_started: Optional[float] = None
+
+    async def listen_for_wake_word(self, stop_signal: Optional[threading.Event] = None) -> bool:
+        self.logger.info(f"va_stt_provider: Listening for wake word: {self.wakeword} ({self.mode} mode)")
+        start = time.monotonic()
+        try:
+            listen = self._listen_rolling() if self.mode == 'rolling' else self._listen_session()
+            # the STT sessions can run for seconds, do not wait for them when we are stopped
+            detected = await self._until_stopped(listen, stop_signal)
+            if detected:
+                self._mark_detection()
+                self._log_detection(time.monotonic() - start)
+                if stop_signal is not None:
+                    stop_signal.set()
+            return detected
+        finally:
+            self.listening_seconds += time.monotonic() - start
+
+    async def _listen_session(self) -> bool:
         """
         Continuously:
           - Use VAD to detect if someone starts speaking.
           - Then run the remote Whisper streaming to see if the wakeword is spoken.
           - If the STT ends without detecting the wakeword, go back to VAD listening.
         """
-        self.logger.info(f"va_stt_provider: Listening for wake word: {self.wakeword}")
-
         while True:
             # 1) Wait until there's any speech (via VAD)
             self.logger.debug("waiting for speech via VAD...")
@@ -51,24 +127,19 @@ class SttProviderWakeWord(VoiceActivationInterface):
 
             # 2) Now open a fresh record stream for STT
             audio_stream = self.soundcard.get_record_stream()
+            self.sessions += 1
 
-            def on_ws_open():
-                self.logger.debug("WebSocket opened.")
-
-            def on_ws_close():
-                self.logger.debug("WebSocket closed.")
-
+            updates = self.stt.transcribe_updates(
+                audio_stream=audio_stream,
+                websocket_on_close=self._on_ws_close,
+                websocket_on_open=self._on_ws_open
+            )
             try:
                 # 3) Stream to Whisper and look for the wake word
-                async for partial_text in self.stt.transcribe_stream(
-                    audio_stream=audio_stream,
-                    websocket_on_close=on_ws_close,
-                    websocket_on_open=on_ws_open
-                ):
-                    # Check if partial transcript includes wakeword
-                    if self.wakeword.lower() in partial_text.lower():
-                        self.logger.info(f"Wake word '{self.wakeword}' detected!")
-                        return
+                async for update in updates:
+                    # Check the whole hypothesis, the wake word does not have to be stable yet
+                    if self._contains_wakeword(update.text):
+                        return True
 
                 # If the transcription generator ended without detecting wakeword
                 self.logger.debug("Remote STT ended. Going back to VAD listening...")
@@ -76,43 +147,147 @@ class SttProviderWakeWord(VoiceActivationInterface):
                 self.logger.warning("User aborted in wake word section", exc_info=True)
                 raise e
             except asyncio.CancelledError:
-                self.logger.error("Cancelled.", exc_info=True)
-                return
+                # listen_for_wake_word has been stopped
+                self.logger.debug("Cancelled.")
+                return False
             except Exception as e:
                 self.logger.error(f"error in STT: {e}")
                 # Return to VAD loop
                 await asyncio.sleep(1.0)
+            finally:
+                await updates.aclose()
+
+    async def _listen_rolling(self) -> bool:
+        """Feed the speech of one continuous record stream to rotating STT sessions, see the class doc."""
+        detected = asyncio.Event()
+        sessions: List[_RollingSession] = []
+        session: Optional[_RollingSession] = None
+        # chunks before the start of speech, and the last chunks of speech (seed of the next session)
+        lead: Deque[bytes] = deque()
+        recent: Deque[bytes] = deque()
+        self.vad.reset()
+        audio_stream = None
+        try:
+            while True:
+                audio_stream = self.soundcard.get_record_stream()
+                async for chunk in audio_stream:
+                    if detected.is_set():
+                        return True
+                    now = time.monotonic()
+                    events = self.vad.process(chunk)
+                    if any(event.kind == SPEECH_START for event in events):
+                        self._speech_started = now
+                        chunks = [*lead, chunk]
+                        lead.clear()
+                    elif self.vad.in_speech or events:
+                        chunks = [chunk]
+                    else:
+                        lead.append(chunk)
+                        _trim(lead, self.lead_samples)
+                        if session is not None and now - session.last_audio > self.session_idle:
+                            self.logger.debug("No speech, ending the STT session")
+                            session.finish()
+                            session = None
+                            # the next session must not start with the speech of this one
+                            recent.clear()
+                        continue
+
+                    if session is not None and session.task.done():
+                        if session.ended is not None and now - session.ended < self.retry_delay:
+                            # the session has failed just now, keep the audio for the next one
+                            recent.extend(chunks)
+                            _trim(recent, self.overlap_samples)
+                            continue
+                        session = None
+                    for c in chunks:
+                        if session is None or session.samples >= self.window_samples:
+                            if session is not None:
+                                self.logger.debug("Window full, rotating the STT session")
+                                session.finish()
+                            session = self._start_session(detected, recent)
+                            sessions.append(session)
+                        session.send(c)
+                        recent.append(c)
+                        _trim(recent, self.overlap_samples)
+                    sessions = [s for s in sessions if not s.task.done()]
+                # stop_recording() ends the record streams of all consumers, keep listening
+                if detected.is_set():
+                    return True
+                self.logger.debug("_listen_rolling: Audio stream ended, subscribing again")
+                await audio_stream.aclose()
+        finally:
+            if audio_stream is not None:
+                await audio_stream.aclose()
+            for s in sessions:
+                s.task.cancel()
+            await asyncio.gather(*(s.task for s in sessions), return_exceptions=True)
+
+    def _start_session(self, detected: asyncio.Event, seed: Deque[bytes]) -> _RollingSession:
+        session = _RollingSession()
+        for chunk in seed:
+            session.send(chunk)
+        session.task = asyncio.create_task(self._run_session(session, detected))
+        self.sessions += 1
+        return session
+
+    async def _run_session(self, session: _RollingSession, detected: asyncio.Event):
+        async def audio_stream():
+            while (chunk := await session.queue.get()) is not None:
+                yield chunk
+
+        updates = self.stt.transcribe_updates(audio_stream(), self._on_ws_close, self._on_ws_open)
+        try:
+            async for update in updates:
+                if self._contains_wakeword(update.text):
+                    detected.set()
+                    return
+        except Exception as e:
+            self.logger.error(f"error in STT: {e}")
+        finally:
+            session.ended = time.monotonic()
+            await updates.aclose()
 
     async def _wait_for_speech(self) -> bool:
         """
-        Continuously reads raw audio from the soundcard in small chunks.
-        Checks each chunk for speech using WebRTC VAD.
-        Returns True as soon as we detect speech.
+        Continuously reads raw audio from the soundcard and feeds it to the VAD stage.
+        Returns True as soon as speech starts.
         If the audio stream ends for some reason, we return False.
         """
+        self.vad.reset()
         audio_stream = self.soundcard.get_record_stream()
         try:
             async for chunk in audio_stream:
-                if self._chunk_has_speech(chunk):
+                if any(event.kind == SPEECH_START for event in self.vad.process(chunk)):
+                    self._speech_started = time.monotonic()
                     return True
         except Exception as e:
             self.logger.error(f"_wait_for_speech: Audio stream ended or error: {e}")
+        finally:
+            await audio_stream.aclose()
         return False
 
-    def _chunk_has_speech(self, chunk: bytes) -> bool:
-        """
-        Break `chunk` into 20ms frames and check if any frame has speech
-        according to WebRTC VAD.
-        - chunk is 16-bit, mono, 16kHz PCM => 1 sample = 2 bytes, 1 second = 32000 bytes
-        - 20ms = 0.02s => 320 samples => 640 bytes
-        """
-        frame_size = int(self.soundcard.sample_rate * (self.vad_frame_ms / 1000.0))  # in samples
-        bytes_per_frame = frame_size * 2  # 2 bytes per sample for 16-bit
-        idx = 0
-        while idx + bytes_per_frame <= len(chunk):
-            frame = chunk[idx: idx + bytes_per_frame]
-            # webrtcvad expects 16-bit little-endian, 1ch, 16k sample rate
-            if self.vad.is_speech(frame, self.soundcard.sample_rate):
-                return True
-            idx += bytes_per_frame
-        return False
+    def _contains_wakeword(self, text: str) -> bool:
+        return self.wakeword.lower() in text.lower()
+
+    def _log_detection(self, listened: float):
+        latency = time.monotonic() - self._speech_started if self._speech_started is not None else 0.0
+        hours = (self.listening_seconds + listened) / 3600
+        self.logger.info(f"Wake word '{self.wakeword}' detected! {latency:.2f}s after the start of speech, "
+                         f"{self.sessions} STT sessions in {hours * 60:.1f} min of listening "
+                         f"({self.sessions / max(hours, 1e-9):.0f} per hour)")
+
+    def _on_ws_open(self):
+        self.logger.debug("WebSocket opened.")
+
+    def _on_ws_close(self):
+        self.logger.debug("WebSocket closed.")
+
+    def config_str(self):
+        return f'{super().config_str()}, mode: {self.mode}'
+
+
+def _trim(chunks: Deque[bytes], max_samples: int):
+    """Drop the oldest chunks while the rest still holds `max_samples`."""
+    total = sum(len(chunk) for chunk in chunks) // 2
+    while chunks and total - len(chunks[0]) // 2 >= max_samples:
+        total -= len(chunks.popleft()) // 2
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import vosk
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+from vocallmate.voice_activated_recording.va_interface import VoiceActivationInterface
+from vocallmate.stt.stt_model_registry import acquire_vosk_model, release_vosk_model
+
+
+class VoskKeywordWakeWord(VoiceActivationInterface):
+    """
+    Spots the wake word locally on the CPU, the STT server is not used until it is detected.
+
+    A Vosk recognizer is restricted to a grammar of the wake word and the garbage token "[unk]",
+    so everything else that is said (TV, conversations) decodes to "[unk]". A one word grammar
+    turns near matches into the wake word too, so it is only detected when all its words have
+    a confidence of at least WAKEWORD_THRESHOLD / 500. Partial results carry no confidence:
+    as soon as a partial contains the wake word the utterance is finalized right away (no
+    waiting for the silence after it) and the confidence of the final result is checked.
+    Decoding runs on its own thread. The model is loaded when listening starts and shared with
+    the local STT provider if both use the same folder, close() gives it back.
+
+    For every detection the decode latency (from receiving the audio chunk to the detection)
+    and the CPU time per second of audio are logged.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
+        # a small model is enough for a one word grammar
+        self.model_path = os.getenv('WAKEWORD_VOSK_MODEL_PATH', os.getenv('VOSK_MODEL_PATH', './model'))
+        if not os.path.isdir(self.model_path):
+            raise RuntimeError(f"Vosk model folder not found at: {self.model_path}")
+        self.grammar = json.dumps([self.wakeword.lower(), "[unk]"])
+        self.min_confidence = self.wakeword_threshold / 500.0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="VoskKws")
+        # the model is loaded on the decoder thread when listening starts
+        self.model: Optional[Future] = None
+        # decode CPU time and audio seconds since the last report
+        self.cpu_seconds = 0.0
+        self.audio_seconds = 0.0
+        # seconds of audio between CPU reports while nobody says the wake word
+        self.report_interval = 600
+
+    async def listen_for_wake_word(self, stop_signal: Optional[threading.Event] = None) -> bool:
+        self.logger.info(f"Listening for wake word: {self.wakeword}")
+        loop = asyncio.get_running_loop()
+        if self.model is None:
+            self.model = self.executor.submit(acquire_vosk_model, self.model_path)
+        model = await asyncio.wrap_future(self.model)
+        recognizer = vosk.KaldiRecognizer(model, self.soundcard.sample_rate, self.grammar)
+        recognizer.SetWords(True)
+        start = time.monotonic()
+        async for chunk in self.soundcard.get_record_stream():
+            if stop_signal is not None and stop_signal.is_set():
+                return False
+            received = time.monotonic()
+            detected, cpu = await loop.run_in_executor(self.executor, self._decode, recognizer, chunk)
+            self.cpu_seconds += cpu
+            self.audio_seconds += len(chunk) / 2 / self.soundcard.sample_rate
+            if not detected and self.audio_seconds >= self.report_interval:
+                self.logger.info(f"Keyword spotting CPU {self._cpu_per_audio_second():.1f} ms per s of audio")
+                self.cpu_seconds = self.audio_seconds = 0.0
+            if detected:
+                self._mark_detection()
+                self.logger.info(f"Wake word '{self.wakeword}' detected after {time.monotonic() - start:.1f}s, "
+                                 f"decode latency {(time.monotonic() - received) * 1000:.1f} ms, "
+                                 f"CPU {self._cpu_per_audio_second():.1f} ms per s of audio "
+                                 f"({self.audio_seconds:.0f}s of audio)")
+                self.cpu_seconds = self.audio_seconds = 0.0
+                if stop_signal is not None:
+                    stop_signal.set()
+                return True
+        return False
+
+    def _decode(self, recognizer: vosk.KaldiRecognizer, chunk: bytes) -> Tuple[bool, float]:
+        """Runs on the decoder thread: feed one chunk, return if the wake word was spotted and the CPU time."""
+        cpu_start = time.thread_time()
+        if recognizer.AcceptWaveform(chunk):
+            result = json.loads(recognizer.Result())
+        elif self._contains_wakeword(json.loads(recognizer.PartialResult()).get("partial", "")):
+            # partials have no confidence, finish the utterance now to get the one of the words
+            result = json.loads(recognizer.FinalResult())
+        else:
+            return False, time.thread_time() - cpu_start
+        wake_words = self.wakeword.lower().split()
+        # without word entries there is no confidence, that is no detection
+        matched = [w for w in result.get("result", []) if w.get("word") in wake_words]
+        detected = (self._contains_wakeword(result.get("text", "")) and len(matched) > 0 and
+                    all(w.get("conf", 0.0) >= self.min_confidence for w in matched))
+        if not detected and self._contains_wakeword(result.get("text", "")):
+            self.logger.debug(f"Wake word below the confidence {self.min_confidence:.2f}: {result.get('result')}")
+        return detected, time.thread_time() - cpu_start
+
+    def close(self):
+        """Give back the model, it is freed when no other provider uses it."""
+        model, self.model = self.model, None
+        if model is not None:
+            # once it has been loaded, if that is still running
+            model.add_done_callback(self._release_model)
+
+    def __del__(self):
+        if getattr(self, 'model', None) is not None:
+            self.close()
+
+    def _release_model(self, model: Future):
+        if not model.cancelled() and model.exception() is None:
+            release_vosk_model(self.model_path)
+
+    def _cpu_per_audio_second(self) -> float:
+        return self.cpu_seconds / max(self.audio_seconds, 1e-9) * 1000
+
+    def _contains_wakeword(self, text: str) -> bool:
+        return f" {self.wakeword.lower()} " in f" {text} "
+
+    def config_str(self):
+        return f'{super().config_str()}, model: {self.model_path}'
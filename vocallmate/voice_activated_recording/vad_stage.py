@@ -0,0 +1,96 @@
+import os
+import webrtcvad
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Union
+from vocallmate.audio_device.frame_assembler import FrameAssembler
+
+SPEECH_START = 'speech_start'
+SPEECH_END = 'speech_end'
+
+
+@dataclass(frozen=True)
+class VadEvent:
+    """Start or end of speech, `position` is the sample position in the stream where it was decided."""
+    kind: str
+    position: int
+    sample_rate: int
+
+    @property
+    def time(self) -> float:
+        """Seconds since the stage has started (or has been reset)."""
+        return self.position / self.sample_rate
+
+
+class VadStage:
+    """
+    Voice activity detection for a stream of int16 PCM chunks, as a state machine that
+    reports when speech starts and ends.
+
+    The chunks are cut into frames of `frame_ms` (leftover samples are kept for the next chunk).
+    Frames with an RMS below `energy_threshold` are silence without asking WebRTC VAD, which
+    is much cheaper. Keep the threshold near the noise floor of the microphone: WebRTC VAD
+    adapts its noise model to the frames it gets, if it never sees the quiet ones it misses
+    quiet speech. Speech starts after `onset_frames` consecutive voiced
+    frames, so a click does not count, and ends after `hangover_frames` consecutive unvoiced
+    frames, so short pauses between words do not end it.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20, vad_mode: int = 2,
+                 onset_frames: int = 3, hangover_frames: int = 15, energy_threshold: Optional[float] = None):
+        """
+        :param frame_ms: VAD frame length, 10, 20 or 30 ms
+        :param vad_mode: WebRTC VAD aggressiveness, 0 (least) to 3 (most aggressive)
+        :param energy_threshold: RMS (int16 scale) below which a frame is silence, 0 disables the gate,
+                                 default VAD_ENERGY_THRESHOLD
+        """
+        if energy_threshold is None:
+            energy_threshold = float(os.getenv('VAD_ENERGY_THRESHOLD', '10'))
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.vad = webrtcvad.Vad(vad_mode)
+        self.onset_frames = onset_frames
+        self.hangover_frames = hangover_frames
+        # compared with the sum of squares of a frame, no square root or division per frame
+        self._energy_limit = energy_threshold ** 2 * self.frame_length
+        self._frames = FrameAssembler(self.frame_length)
+        self.reset()
+
+    def reset(self):
+        self._frames.reset()
+        self.in_speech = False
+        self.position = 0
+        self.voiced_run = 0
+        self.unvoiced_run = 0
+        # statistics: frames seen and frames that had to be classified by WebRTC VAD
+        self.frames = 0
+        self.vad_frames = 0
+
+    def process(self, chunk: Union[bytes, np.ndarray]) -> List[VadEvent]:
+        """Classify the complete frames of a chunk, returns the speech start and end events."""
+        events = []
+        for frame in self._frames.push(chunk):
+            self.position += self.frame_length
+            if self._is_voiced(frame):
+                self.voiced_run += 1
+                self.unvoiced_run = 0
+                if not self.in_speech and self.voiced_run >= self.onset_frames:
+                    self.in_speech = True
+                    events.append(VadEvent(SPEECH_START, self.position, self.sample_rate))
+            else:
+                self.unvoiced_run += 1
+                self.voiced_run = 0
+                if self.in_speech and self.unvoiced_run >= self.hangover_frames:
+                    self.in_speech = False
+                    events.append(VadEvent(SPEECH_END, self.position, self.sample_rate))
+        return events
+
+    def _is_voiced(self, frame: np.ndarray) -> bool:
+        self.frames += 1
+        samples = frame.astype(np.float32)
+        if np.dot(samples, samples) < self._energy_limit:
+            return False
+        self.vad_frames += 1
+        # WebRTC VAD takes the frame as bytes, a view of the int16 samples
+        return self.vad.is_speech(frame.view(np.uint8), self.sample_rate)